@@ -0,0 +1,34 @@
+# ==================== admin_auth.py ====================
+import hmac
+from flask import current_app, request, Response
+
+# Gate for the operator endpoints (/metrics, /admin/...).
+# The peer address can't be used for this: behind a local reverse proxy
+# every client shows up as 127.0.0.1. The caller has to present
+# app.config['ADMIN_TOKEN'] instead, either as a bearer token (what a
+# Prometheus scrape config's `authorization` sends) or as the password of
+# HTTP Basic auth, so the admin pages can be opened in a browser. With no
+# token configured these endpoints are switched off.
+
+
+def _presented():
+    auth = request.authorization
+    if auth is None:
+        return None
+    if auth.type == 'bearer':
+        return auth.token
+    if auth.type == 'basic':
+        return auth.password
+    return None
+
+def admin_allowed():
+    token = current_app.config.get('ADMIN_TOKEN')
+    given = _presented()
+    if not token or not given:
+        return False
+    return hmac.compare_digest(given.encode('utf-8'), token.encode('utf-8'))
+
+def admin_denied():
+    # 401 with a Basic challenge, so a browser asks for the token
+    return Response('Admin token required\n', status=401, mimetype='text/plain',
+                    headers={'WWW-Authenticate': 'Basic realm="admin"'})
@@ -1,5 +1,7 @@
+import os
 from flask import Flask, redirect, url_for, session, render_template
 from database import init_app
+import metrics
 from modules.user_module import user_bp
 from modules.transaction_module import transaction_bp
 from modules.category_module import category_bp
@@ -9,10 +11,20 @@ from modules.payment_module import payment_bp
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-in-production'
+# Server-Timing summary on every response (always on in debug mode)
+app.config['METRICS_HEADER'] = False
+# token for /metrics and the /admin pages, as a bearer token or Basic auth
+# password (admin_auth.py); unset = those are off
+app.config['ADMIN_TOKEN'] = os.environ.get('FINGEN_ADMIN_TOKEN')
+# show the params column on /admin/slow-queries
+app.config['SLOW_QUERY_SHOW_PARAMS'] = False
 
 # Initialize database
 init_app(app)
 
+# per-request query/template timings at /metrics
+metrics.init_app(app)
+
 app.register_blueprint(user_bp, url_prefix='/user')
 app.register_blueprint(transaction_bp, url_prefix='/transaction')
 app.register_blueprint(category_bp, url_prefix='/category')
@@ -1,6 +1,18 @@
 # ==================== database.py ====================
+import os
+import time
+import queue
+import threading
 import mysql.connector
 from flask import g
+import metrics
+import slow_query
+import migrations
+from sqlite_backend import SQLitePool
+
+# 'mysql', or 'sqlite' to keep everything in one local file (no server)
+DB_BACKEND = os.environ.get('FINGEN_DB_BACKEND', 'mysql')
+SQLITE_PATH = os.environ.get('FINGEN_SQLITE_PATH', 'fingen.db')
 
 DATABASE_CONFIG = {
     'host': 'localhost',
@@ -9,96 +21,86 @@ DATABASE_CONFIG = {
     'database': 'fingen_app'
 }
 
+# Pool settings
+POOL_SIZE = 5        # connections kept open between requests
+POOL_OVERFLOW = 10   # extra connections allowed under burst, closed on return
+POOL_TIMEOUT = 10    # seconds to wait when size + overflow are all busy
+
+class ConnectionPool:
+    def __init__(self, config, size=POOL_SIZE, overflow=POOL_OVERFLOW, timeout=POOL_TIMEOUT):
+        self.config = config
+        self.size = size
+        self.overflow = overflow
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+        # counts checked-out + idle connections
+        self._slots = threading.BoundedSemaphore(size + overflow)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError('Database connection pool exhausted')
+        try:
+            conn = self._idle.get_nowait()
+            if not conn.is_connected():
+                conn.reconnect()
+            return conn
+        except queue.Empty:
+            pass
+        except Exception:
+            # dead connection, fall through and open a new one
+            pass
+        try:
+            return mysql.connector.connect(**self.config)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn):
+        try:
+            # reset so the next request starts from a clean session
+            if conn.unread_result:
+                conn.consume_results()
+            conn.rollback()
+            conn.reset_session()
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            # overflow connection, not worth keeping
+            conn.close()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        finally:
+            self._slots.release()
+
+if DB_BACKEND == 'sqlite':
+    pool = SQLitePool(SQLITE_PATH, timeout=POOL_TIMEOUT)
+else:
+    pool = ConnectionPool(DATABASE_CONFIG)
+
 def get_db():
     if 'db' not in g:
-        g.db = mysql.connector.connect(**DATABASE_CONFIG)
+        start = time.perf_counter()
+        conn = pool.acquire()
+        metrics.record_acquire(time.perf_counter() - start)
+        # queries through it are counted/timed per request (see metrics.py)
+        g.db = metrics.TimedConnection(conn)
     return g.db
 
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        pool.release(db.raw)
 
 def init_app(app):
     app.teardown_appcontext(close_db)
-    
-    # Create database if not exists
-    conn = mysql.connector.connect(
-        host=DATABASE_CONFIG['host'],
-        user=DATABASE_CONFIG['user'],
-        password=DATABASE_CONFIG['password']
-    )
-    cursor = conn.cursor()
-    cursor.execute("CREATE DATABASE IF NOT EXISTS fingen_app")
-    cursor.close()
-    conn.close()
-    
-    # Create tables
-    with app.app_context():
-        db = get_db()
-        cursor = db.cursor()
-        
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(100) UNIQUE NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Categories table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                name VARCHAR(100) NOT NULL,
-                type ENUM('income', 'expense') DEFAULT 'expense',
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Transactions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                category_id INT,
-                date DATE NOT NULL,
-                amount DECIMAL(10, 2) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE SET NULL
-            )
-        """)
-        
-        # Spending limits table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS spending_limits (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT UNIQUE NOT NULL,
-                daily_limit DECIMAL(10, 2) NOT NULL DEFAULT 0,
-                borrowed_amount DECIMAL(10, 2) DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        """)
-        
-        # Payments table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS payments (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                amount DECIMAL(10, 2) NOT NULL,
-                description TEXT,
-                status ENUM('paid', 'unpaid') DEFAULT 'unpaid',
-                payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        """)
-        
-        db.commit()
-        cursor.close()
 
+    # one version check per boot, tables are only touched when a
+    # migration is pending (see migrations.py)
+    if DB_BACKEND == 'sqlite':
+        slow_query.init_app(app, DATABASE_CONFIG, explain_with=pool.explain)
+        migrations.migrate_sqlite(pool)
+    else:
+        slow_query.init_app(app, DATABASE_CONFIG)
+        migrations.migrate_mysql(pool, DATABASE_CONFIG)
@@ -0,0 +1,185 @@
+# ==================== metrics.py ====================
+import time
+import bisect
+import threading
+import slow_query
+from admin_auth import admin_allowed, admin_denied
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered, Response
+
+# Request timings for /metrics (Prometheus text format).
+# get_db() hands out a TimedConnection, so every query a view runs is
+# counted and timed; template rendering is timed through Flask's signals.
+# At the end of the request it all lands in histograms per endpoint
+# (dashboard, transaction.add, report.view, ...). Numbers are per process.
+# Same Histogram and config keys (METRICS_HEADER, ADMIN_TOKEN) as the
+# student tracker's modules/metrics.py; each app keeps its own copy.
+
+# seconds
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label='endpoint'):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        self._series = {}   # label value -> [bucket counts..., sum, count]
+
+    def observe(self, label_value, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(label_value)
+            if s is None:
+                s = self._series[label_value] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for lv, s in sorted(series.items()):
+            lbl = f'{self.label}="{_escape(lv)}"'
+            acc = 0
+            for b, n in zip(self.buckets, s):
+                acc += n
+                lines.append(f'{self.name}_bucket{{{lbl},le="{b}"}} {acc}')
+            lines.append(f'{self.name}_bucket{{{lbl},le="+Inf"}} {s[-1]}')
+            lines.append(f'{self.name}_sum{{{lbl}}} {round(s[-2], 6)}')
+            lines.append(f'{self.name}_count{{{lbl}}} {s[-1]}')
+        return lines
+
+
+def _escape(v):
+    return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('fingen_request_seconds', 'Time spent handling the request', TIME_BUCKETS)
+DB_QUERIES = Histogram('fingen_db_queries_per_request', 'Queries executed per request', COUNT_BUCKETS)
+DB_SECONDS = Histogram('fingen_db_seconds', 'Time spent in queries and fetches, per request', TIME_BUCKETS)
+ACQUIRE_SECONDS = Histogram('fingen_db_acquire_seconds', 'Time spent getting a pooled connection, per request', TIME_BUCKETS)
+TEMPLATE_SECONDS = Histogram('fingen_template_seconds', 'Time spent rendering templates, per request', TIME_BUCKETS)
+
+_HISTOGRAMS = [REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, ACQUIRE_SECONDS, TEMPLATE_SECONDS]
+
+
+def _stats():
+    if has_request_context():
+        return g.get('req_stats')
+    return None
+
+def _add(key, seconds, queries=0):
+    st = _stats()
+    if st is not None:
+        st[key] += seconds
+        st['queries'] += queries
+
+def record_acquire(seconds):
+    _add('acquire', seconds)
+
+
+class TimedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._stmt = None   # [sql, params, seconds so far, already logged]
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, name, args, queries):
+        start = time.perf_counter()
+        try:
+            return getattr(self._cursor, name)(*args)
+        finally:
+            took = time.perf_counter() - start
+            _add('db', took, queries)
+            if queries:
+                # (executemany batches are left out of the slow log)
+                self._stmt = [args[0], args[1] if len(args) > 1 else None, took, name == 'executemany']
+            elif self._stmt is not None:
+                self._stmt[2] += took
+            # fetches count toward the statement they belong to
+            if self._stmt is not None and not self._stmt[3]:
+                self._stmt[3] = slow_query.check(*self._stmt[:3])
+
+    def execute(self, *args):
+        return self._timed('execute', args, 1)
+
+    def executemany(self, *args):
+        return self._timed('executemany', args, 1)
+
+    def fetchone(self):
+        return self._timed('fetchone', (), 0)
+
+    def fetchmany(self, *args):
+        return self._timed('fetchmany', args, 0)
+
+    def fetchall(self):
+        return self._timed('fetchall', (), 0)
+
+
+class TimedConnection:
+    # what get_db() returns; .raw is the pooled mysql connection
+    def __init__(self, raw):
+        self.raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self.raw.cursor(*args, **kwargs))
+
+
+def _before_request():
+    g.req_stats = {'start': time.perf_counter(), 'queries': 0, 'db': 0.0, 'acquire': 0.0, 'template': 0.0}
+
+def _template_started(sender, template, context, **extra):
+    st = _stats()
+    if st is not None:
+        st['tpl_start'] = time.perf_counter()
+
+def _template_done(sender, template, context, **extra):
+    st = _stats()
+    if st is not None and 'tpl_start' in st:
+        st['template'] += time.perf_counter() - st.pop('tpl_start')
+
+def _after_request(response):
+    st = g.get('req_stats')
+    if st is None:
+        return response
+
+    took = time.perf_counter() - st['start']
+    endpoint = request.endpoint or 'unmatched'
+    REQUEST_SECONDS.observe(endpoint, took)
+    DB_QUERIES.observe(endpoint, st['queries'])
+    DB_SECONDS.observe(endpoint, st['db'])
+    ACQUIRE_SECONDS.observe(endpoint, st['acquire'])
+    TEMPLATE_SECONDS.observe(endpoint, st['template'])
+
+    if current_app.debug or current_app.config.get('METRICS_HEADER', False):
+        ms = lambda s: round(s * 1000, 2)
+        response.headers['Server-Timing'] = (
+            f'db;dur={ms(st["db"])};desc="{st["queries"]} queries", '
+            f'acquire;dur={ms(st["acquire"])}, tpl;dur={ms(st["template"])}, app;dur={ms(took)}'
+        )
+    return response
+
+def metrics_view():
+    if not admin_allowed():
+        return admin_denied()
+    lines = []
+    for h in _HISTOGRAMS:
+        lines.extend(h.expose())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_done, app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
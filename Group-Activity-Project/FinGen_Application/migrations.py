@@ -0,0 +1,196 @@
+# ==================== migrations.py ====================
+import mysql.connector
+from mysql.connector import errorcode
+from sqlite_backend import SCHEMA as SQLITE_SCHEMA
+
+# Versioned schema changes.
+# schema_version records which migrations have been applied. At boot each
+# worker does one cheap check (SELECT MAX(version)) and is done if it's
+# already at LATEST; otherwise it takes a lock - GET_LOCK on MySQL, the
+# write lock on SQLite - so only one worker migrates while the others
+# wait, re-reads the version and applies what's still pending, in order.
+#
+# To change the schema append a migration to BOTH lists with the next
+# version number; never edit one that has shipped.
+
+LOCK_NAME = 'fingen_migrations'
+LOCK_TIMEOUT = 60   # seconds a worker waits for another one's migration
+
+MYSQL_MIGRATIONS = [
+    (1, 'initial tables', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) UNIQUE NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            type ENUM('income', 'expense') DEFAULT 'expense',
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            category_id INT,
+            date DATE NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE SET NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS spending_limits (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT UNIQUE NOT NULL,
+            daily_limit DECIMAL(10, 2) NOT NULL DEFAULT 0,
+            borrowed_amount DECIMAL(10, 2) DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS payments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            description TEXT,
+            status ENUM('paid', 'unpaid') DEFAULT 'unpaid',
+            payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """,
+    ]),
+    # keyset paging of /transaction/ history, newest first (with and
+    # without the category filter)
+    (2, 'transaction history indexes', [
+        # one ALTER so it's all or nothing; MySQL has no CREATE INDEX IF NOT
+        # EXISTS, a re-run after a crash gets ER_DUP_KEYNAME (see _apply)
+        """
+        ALTER TABLE transactions
+            ADD INDEX idx_history (user_id, date, id),
+            ADD INDEX idx_history_category (user_id, category_id, date, id)
+        """,
+    ]),
+]
+
+SQLITE_MIGRATIONS = [
+    (1, 'initial tables', [s for s in SQLITE_SCHEMA.split(';') if s.strip()]),
+    (2, 'transaction history indexes', [
+        "CREATE INDEX IF NOT EXISTS idx_history ON transactions (user_id, date, id)",
+        "CREATE INDEX IF NOT EXISTS idx_history_category ON transactions (user_id, category_id, date, id)",
+    ]),
+]
+
+LATEST = MYSQL_MIGRATIONS[-1][0]
+assert [m[0] for m in MYSQL_MIGRATIONS] == [m[0] for m in SQLITE_MIGRATIONS], 'migration lists out of step'
+
+VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def _version(cursor):
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+    except mysql.connector.ProgrammingError as e:
+        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        return 0
+    return row[0] or 0
+
+def _apply(conn, cursor, migrations, current):
+    # MySQL commits DDL as it goes, so each migration is recorded right
+    # after its statements (keep them re-runnable: IF NOT EXISTS etc.).
+    # A worker that died between an ADD INDEX and recording it leaves the
+    # index behind, so an index that's already there counts as done.
+    for version, name, statements in migrations:
+        if version <= current:
+            continue
+        for sql in statements:
+            try:
+                cursor.execute(sql)
+            except mysql.connector.Error as e:
+                if e.errno != errorcode.ER_DUP_KEYNAME:
+                    raise
+        cursor.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+        print(f"Applied migration {version}: {name}")
+
+
+def migrate_mysql(pool, config):
+    try:
+        conn = pool.acquire()
+    except mysql.connector.Error as e:
+        if e.errno != errorcode.ER_BAD_DB_ERROR:
+            raise
+        # first run on this server
+        server = mysql.connector.connect(host=config['host'], user=config['user'], password=config['password'])
+        cursor = server.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{config['database']}`")
+        cursor.close()
+        server.close()
+        conn = pool.acquire()
+
+    # buffered: single-row SELECTs in between DDL, no unread results
+    cursor = conn.cursor(buffered=True)
+    try:
+        if _version(cursor) >= LATEST:
+            return
+
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError(f"Timed out after {LOCK_TIMEOUT}s waiting for another worker's migration")
+        try:
+            cursor.execute(VERSION_TABLE)
+            # whoever held the lock before us may have done it all already
+            _apply(conn, cursor, MYSQL_MIGRATIONS, _version(cursor))
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchone()
+    finally:
+        cursor.close()
+        pool.release(conn)
+
+
+def migrate_sqlite(pool):
+    conn = pool.acquire()
+    raw = conn.raw
+    try:
+        has_table = raw.execute("SELECT 1 FROM sqlite_master WHERE name = 'schema_version'").fetchone()
+        if has_table and (raw.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0) >= LATEST:
+            return
+
+        # the database write lock doubles as the migration lock; DDL is
+        # transactional here, so all pending migrations go in one go or not at all
+        raw.execute('BEGIN IMMEDIATE')
+        try:
+            raw.execute(VERSION_TABLE)
+            current = raw.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+            for version, name, statements in SQLITE_MIGRATIONS:
+                if version <= current:
+                    continue
+                for sql in statements:
+                    raw.execute(sql)
+                raw.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+                print(f"Applied migration {version}: {name}")
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+    finally:
+        pool.release(conn)
@@ -1,7 +1,7 @@
 # ==================== modules/transaction_module.py ====================
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from database import get_db
-from datetime import datetime
+from datetime import datetime, date
 
 transaction_bp = Blueprint('transaction', __name__)
 
@@ -14,6 +14,104 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# History paging: newest first, keyset on (date, id) so page 1000 costs the
+# same as page 1 (idx_history / idx_history_category, see migrations.py).
+# The cursor is the last row shown, e.g. "2024-03-31_1234".
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def _history_filters(args):
+    # -> (where, params, page size), ValueError on bad input
+    where, params = [], []
+    if args.get('from'):
+        where.append("t.date >= %s")
+        params.append(date.fromisoformat(args['from']))
+    if args.get('to'):
+        where.append("t.date <= %s")
+        params.append(date.fromisoformat(args['to']))
+    if args.get('category'):
+        where.append("t.category_id = %s")
+        params.append(int(args['category']))
+    kind = args.get('type')
+    if kind == 'income':
+        where.append("t.amount > 0")
+    elif kind == 'expense':
+        where.append("t.amount < 0")
+    elif kind:
+        raise ValueError(f"type must be income or expense, not {kind!r}")
+    if args.get('after'):
+        day, _, last_id = args['after'].partition('_')
+        day, last_id = date.fromisoformat(day), int(last_id)
+        # the plain t.date bound is what lets both MySQL and SQLite seek
+        # into the index instead of walking down to the cursor
+        where.append("t.date <= %s AND (t.date < %s OR t.id < %s)")
+        params.extend([day, day, last_id])
+    limit = min(max(int(args.get('n', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    return where, params, limit
+
+def _history(user_id, args):
+    where, params, limit = _history_filters(args)
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT t.id, t.date, t.amount, t.description, t.category_id, c.name AS category
+        FROM transactions t
+        LEFT JOIN categories c ON c.id = t.category_id
+        WHERE {' AND '.join(['t.user_id = %s'] + where)}
+        ORDER BY t.date DESC, t.id DESC
+        LIMIT %s
+    """, [user_id] + params + [limit + 1])
+    rows = cursor.fetchall()
+    cursor.close()
+
+    # one extra row tells us whether there is an older page
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1]['date'].isoformat()}_{rows[-1]['id']}"
+    return rows, next_cursor
+
+@transaction_bp.route('/')
+@login_required
+def history():
+    # kept on the Newest / Older links
+    filters = {k: request.args[k] for k in ('from', 'to', 'category', 'type') if request.args.get(k)}
+    try:
+        transactions, next_cursor = _history(session['user_id'], request.args)
+    except ValueError:
+        flash('Invalid filter', 'error')
+        return redirect(url_for('transaction.history'))
+
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM categories WHERE user_id = %s", (session['user_id'],))
+    categories = cursor.fetchall()
+    cursor.close()
+
+    return render_template('transactions.html', transactions=transactions, categories=categories,
+                           filters=filters, next_cursor=next_cursor,
+                           first_page=not request.args.get('after'))
+
+@transaction_bp.route('/api')
+@login_required
+def history_api():
+    try:
+        rows, next_cursor = _history(session['user_id'], request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'transactions': [{
+            'id': r['id'],
+            'date': r['date'].isoformat(),
+            'amount': float(r['amount']),
+            'type': 'income' if r['amount'] > 0 else 'expense',
+            'category_id': r['category_id'],
+            'category': r['category'],
+            'description': r['description']
+        } for r in rows],
+        'next': next_cursor
+    })
+
 @transaction_bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
@@ -0,0 +1,177 @@
+# ==================== slow_query.py ====================
+import os
+import re
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+from logging.handlers import RotatingFileHandler
+import mysql.connector
+from flask import render_template, request, current_app
+from admin_auth import admin_allowed, admin_denied
+
+# Any statement slower than SLOW_QUERY_MS goes to logs/slow_queries.log
+# (one JSON object per line, rotated) with its SQL normalized, the types of
+# its parameters, the view that ran it and the EXPLAIN plan. Plans are
+# fetched by a background thread on its own connection, at most once a
+# minute per distinct statement. /admin/slow-queries shows the latest ones.
+# Names follow the student tracker's modules/slow_query.py (SlowQueryLog
+# there); each app keeps its own copy.
+
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG = os.path.join('logs', 'slow_queries.log')
+EXPLAIN_EVERY = 60   # seconds between EXPLAINs of the same statement
+
+_LITERALS = [
+    (re.compile(r"'(?:[^'\\]|\\.)*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%\([a-z_]+\)s|%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+_EXPLAINABLE = ('select', 'update', 'delete', 'insert', 'replace')
+# frames that only pass the query along, the caller is whoever is above them
+_PLUMBING = ('metrics', 'slow_query', 'database', 'sqlite_backend')
+
+
+def normalize(sql):
+    for pattern, repl in _LITERALS:
+        sql = pattern.sub(repl, sql)
+    return sql.strip()
+
+def params_shape(params):
+    if not params:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in sorted(params.items())) + '}'
+    return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+
+def find_caller():
+    # first frame that isn't the cursor wrapper / mysql itself, i.e. the
+    # view (transaction_module.add, dashboard, ...)
+    f = sys._getframe(1)
+    while f is not None:
+        mod = f.f_globals.get('__name__', '')
+        if mod not in _PLUMBING and not mod.startswith('mysql'):
+            return f"{mod.split('.')[-1]}.{f.f_code.co_name}"
+        f = f.f_back
+    return 'unknown'
+
+
+_log = logging.getLogger('fingen.slow_queries')
+_log.setLevel(logging.INFO)
+_log.propagate = False
+
+_jobs = queue.Queue(maxsize=500)
+_last_explain = {}
+_lock = threading.Lock()
+_worker = {'pid': None, 'conn': None, 'explain': None}
+_db_config = {}
+
+
+def check(sql, params, seconds):
+    if seconds * 1000 < SLOW_QUERY_MS:
+        return False
+
+    entry = {
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'ms': round(seconds * 1000, 1),
+        'caller': find_caller(),
+        'sql': normalize(sql),
+        'params': params_shape(params)
+    }
+    if sql.lstrip().lower().startswith(_EXPLAINABLE) and _explain_due(entry['sql']):
+        _start_worker()
+        try:
+            _jobs.put_nowait((entry, sql, params))
+            return True
+        except queue.Full:
+            entry['explain'] = 'skipped (queue full)'
+    _write(entry)
+    return True
+
+def _explain_due(key):
+    now = time.monotonic()
+    with _lock:
+        if now - _last_explain.get(key, -EXPLAIN_EVERY) < EXPLAIN_EVERY:
+            return False
+        if len(_last_explain) > 1000:
+            _last_explain.clear()
+        _last_explain[key] = now
+        return True
+
+def _start_worker():
+    with _lock:
+        if _worker['pid'] != os.getpid():
+            _worker['pid'] = os.getpid()
+            _worker['conn'] = None
+            threading.Thread(target=_explain_loop, name='slow-query-explain', daemon=True).start()
+
+def _explain_loop():
+    while True:
+        entry, sql, params = _jobs.get()
+        try:
+            if _worker['explain'] is not None:
+                # SQLite: EXPLAIN QUERY PLAN through the pool
+                entry['explain'] = _worker['explain'](sql, params)
+            else:
+                conn = _worker['conn']
+                if conn is None or not conn.is_connected():
+                    conn = _worker['conn'] = mysql.connector.connect(**_db_config)
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute('EXPLAIN ' + sql, params or ())
+                entry['explain'] = [
+                    {k: r.get(k) for k in ('table', 'type', 'possible_keys', 'key', 'rows', 'Extra')}
+                    for r in cursor.fetchall()
+                ]
+                cursor.close()
+                conn.rollback()
+        except Exception as e:
+            entry['explain'] = f'failed: {e}'
+            _worker['conn'] = None
+        _write(entry)
+
+def _write(entry):
+    _log.info(json.dumps(entry, default=str))
+
+def recent(limit=100):
+    try:
+        with open(SLOW_QUERY_LOG, encoding='utf-8') as f:
+            lines = deque(f, maxlen=limit)
+    except OSError:
+        return []
+    entries = []
+    for line in reversed(lines):
+        try:
+            e = json.loads(line)
+        except ValueError:
+            continue
+        plan = e.get('explain')
+        e['full_scan'] = isinstance(plan, list) and any(r.get('type') == 'ALL' for r in plan)
+        entries.append(e)
+    return entries
+
+def admin_view():
+    if not admin_allowed():
+        return admin_denied()
+    entries = recent(request.args.get('n', 100, type=int))
+    if not current_app.config.get('SLOW_QUERY_SHOW_PARAMS', False):
+        for e in entries:
+            e['params'] = 'redacted'
+    return render_template('slow_queries.html', entries=entries, threshold_ms=SLOW_QUERY_MS)
+
+def init_app(app, db_config, explain_with=None):
+    _db_config.update(db_config)
+    _worker['explain'] = explain_with
+    folder = os.path.dirname(SLOW_QUERY_LOG)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    if not _log.handlers:
+        handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=5 * 1024 * 1024, backupCount=5, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _log.addHandler(handler)
+    app.add_url_rule('/admin/slow-queries', 'slow_queries', admin_view)
@@ -0,0 +1,203 @@
+# ==================== sqlite_backend.py ====================
+import re
+import sqlite3
+import threading
+from datetime import datetime, date
+from decimal import Decimal
+from functools import lru_cache
+
+# SQLite version of the connection pool in database.py, for installs that
+# don't want a MySQL server (DB_BACKEND = 'sqlite'). The whole app lives in
+# one WAL-mode file; every thread keeps its own connections.
+# The blueprints still write MySQL SQL with %s placeholders and ask for
+# cursor(dictionary=True); the cursor here rewrites the few MySQL-only
+# bits they use (CURDATE(), NOW(), DATE_FORMAT) and hands rows back as
+# tuples or dicts, with DATE / TIMESTAMP columns as date / datetime.
+# The tables below are created by migrations.py.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(100) UNIQUE NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(100) NOT NULL,
+    type VARCHAR(10) DEFAULT 'expense' CHECK (type IN ('income', 'expense'))
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    category_id INT REFERENCES categories(id) ON DELETE SET NULL,
+    date DATE NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS spending_limits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT UNIQUE NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    daily_limit DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    borrowed_amount DECIMAL(10, 2) DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    amount DECIMAL(10, 2) NOT NULL,
+    description TEXT,
+    status VARCHAR(10) DEFAULT 'unpaid' CHECK (status IN ('paid', 'unpaid')),
+    payment_date TIMESTAMP DEFAULT (datetime('now', 'localtime'))
+);
+"""
+
+_DATE_FORMAT = re.compile(r"DATE_FORMAT\(\s*([\w.]+)\s*,\s*('[^']*')\s*\)", re.I)
+
+
+@lru_cache(maxsize=256)
+def translate(sql):
+    sql = _DATE_FORMAT.sub(r'strftime(\2, \1)', sql)
+    sql = re.sub(r'\bCURDATE\(\)', "date('now', 'localtime')", sql, flags=re.I)
+    sql = re.sub(r'\bNOW\(\)', "datetime('now', 'localtime')", sql, flags=re.I)
+    # %% only needed escaping for mysql.connector's parameter formatting
+    return sql.replace('%s', '?').replace('%%', '%')
+
+
+def _to_datetime(raw):
+    return datetime.fromisoformat(raw.decode())
+
+def _to_date(raw):
+    return date.fromisoformat(raw.decode()[:10])
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(' '))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_converter('TIMESTAMP', _to_datetime)
+sqlite3.register_converter('DATE', _to_date)
+
+
+class Cursor:
+    def __init__(self, raw, dictionary=False):
+        self._cur = raw.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._cur.execute(translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_params):
+        self._cur.executemany(translate(sql), [tuple(p) for p in seq_params])
+
+    def _row(self, row):
+        if row is not None and self.dictionary:
+            return dict(zip([d[0] for d in self._cur.description], row))
+        return row
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class Connection:
+    def __init__(self, raw):
+        self.raw = raw
+
+    def cursor(self, dictionary=False, **kwargs):
+        return Cursor(self.raw, dictionary=dictionary)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self.raw.close()
+
+
+class SQLitePool:
+    # same acquire()/release() as database.ConnectionPool
+    def __init__(self, path, timeout=10):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        raw = sqlite3.connect(self.path, timeout=self.timeout, detect_types=sqlite3.PARSE_DECLTYPES)
+        raw.execute('PRAGMA journal_mode = WAL')
+        raw.execute('PRAGMA synchronous = NORMAL')
+        raw.execute('PRAGMA foreign_keys = ON')
+        return Connection(raw)
+
+    def _idle(self):
+        if not hasattr(self._local, 'idle'):
+            self._local.idle = []
+        return self._local.idle
+
+    def acquire(self):
+        idle = self._idle()
+        return idle.pop() if idle else self._connect()
+
+    def release(self, conn):
+        try:
+            conn.rollback()
+            self._idle().append(conn)
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def explain(self, sql, params):
+        # EXPLAIN QUERY PLAN rows in the shape slow_query.py keeps for
+        # MySQL; a bare SCAN of a table is a full scan (type ALL)
+        conn = self.acquire()
+        try:
+            rows = conn.raw.execute('EXPLAIN QUERY PLAN ' + translate(sql), tuple(params or ())).fetchall()
+        finally:
+            self.release(conn)
+        plan = []
+        for row in rows:
+            detail = row[-1]
+            m = re.match(r'(SCAN|SEARCH) (\w+)', detail)
+            if m is None:
+                plan.append({'table': None, 'type': None, 'key': None, 'Extra': detail})
+                continue
+            if m.group(1) == 'SEARCH':
+                kind = 'ref'
+            elif 'INDEX' in detail:
+                kind = 'index'
+            else:
+                kind = 'ALL'
+            idx = re.search(r'INDEX (\w+)', detail)
+            plan.append({'table': m.group(2), 'type': kind, 'key': idx.group(1) if idx else None, 'Extra': detail})
+        return plan
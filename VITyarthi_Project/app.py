@@ -1,8 +1,10 @@
 import os
 import hashlib
-from datetime import datetime, timedelta
+import subprocess
+import click
+from datetime import datetime, timedelta, date
 from functools import wraps
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context, send_file, abort
 
 # Imports
 from modules.auth import AuthManager
@@ -11,15 +13,52 @@ from modules.subjects import SubjectManager
 from modules.reports import ReportGenerator
 from modules.charts import ChartGenerator
 from modules.exports import DataExporter
+from modules.db_pool import ConnectionPool
+from modules.sqlite_backend import SQLitePool
+from modules.activity_sink import ActivitySink
+from modules.render_service import RenderService
+from modules.data_version import DataVersions
+from modules.report_cache import ReportCache
+from modules.metrics import init_metrics, register_collector
+from modules.slow_query import SlowQueryLog
+from modules.admin_auth import admin_allowed, admin_denied
+from modules.charts import CHART_TYPES
 
 app = Flask(__name__)
 
 # Config
 app.secret_key = 'your_secret_key_change_in_production_2024'
-CHARTS_DIR = os.path.join('static', 'charts')
+# not under static/: PNGs are only served through chart_png, whose URL
+# carries the chart version so browsers can keep them forever
+CHARTS_DIR = os.path.join('instance', 'charts')
+CHART_CACHE_MAX_BYTES = 50 * 1024 * 1024  # LRU cap for CHARTS_DIR
+CHART_MAX_AGE = 365 * 24 * 3600
+CHART_WORKERS = 2  # render processes per app worker
+DASHBOARD_CHARTS = ('goal_completion', 'weekly_progress', 'subject_performance')
+# in-memory report cache (per worker)
+REPORT_CACHE_ENTRIES = 2000
+REPORT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+REPORT_CACHE_TTL = {'weekly': 300, 'monthly': 900, 'summary': 600}  # seconds
 app.config['UPLOAD_FOLDER'] = CHARTS_DIR
+# draw charts in the browser from /api/charts (False = server side PNGs)
+app.config['CLIENT_SIDE_CHARTS'] = True
+# Server-Timing summary on every response (always on in debug mode)
+app.config['METRICS_HEADER'] = False
+# token for /metrics and the /admin pages, as a bearer token or Basic auth
+# password (modules/admin_auth.py); unset = those are off
+app.config['ADMIN_TOKEN'] = os.environ.get('TRACKER_ADMIN_TOKEN')
+# show the params column on /admin/slow-queries
+app.config['SLOW_QUERY_SHOW_PARAMS'] = False
+
+# statements slower than this get logged with their EXPLAIN plan
+SLOW_QUERY_MS = 200
+SLOW_QUERY_LOG = os.path.join('logs', 'slow_queries.log')
 
 # DB Connection
+# 'mysql', or 'sqlite' for a single local file (no server needed, see
+# modules/sqlite_backend.py and database/schema_sqlite.sql)
+DB_BACKEND = os.environ.get('TRACKER_DB_BACKEND', 'mysql')
+SQLITE_PATH = os.environ.get('TRACKER_SQLITE_PATH', os.path.join('instance', 'student_tracker.db'))
 db_conf = {
     'host': 'localhost',
     'user': 'root',
@@ -27,13 +66,108 @@ db_conf = {
     'database': 'student_tracker_db'
 }
 
+# One pool shared by every manager (per worker process)
+DB_POOL_SIZE = 10
+DB_POOL_TIMEOUT = 10  # seconds to wait for a free connection
+if DB_BACKEND == 'sqlite':
+    # per-thread connections, WAL; timeout is how long a writer waits for the lock
+    db_pool = SQLitePool(SQLITE_PATH, timeout=DB_POOL_TIMEOUT)
+    db_pool.slow_log = SlowQueryLog(db_conf, SLOW_QUERY_LOG, threshold_ms=SLOW_QUERY_MS,
+                                    explain_with=db_pool.explain)
+else:
+    db_pool = ConnectionPool(db_conf, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+    db_pool.slow_log = SlowQueryLog(db_conf, SLOW_QUERY_LOG, threshold_ms=SLOW_QUERY_MS)
+
+# activity_logs inserts are batched in the background
+activity_sink = ActivitySink(db_pool, batch_size=100, flush_interval=2.0)
+
+# per-user data version, bumped after any write (see modules/data_version.py)
+versions = DataVersions(db_pool)
+# activity rows land up to flush_interval after the request that bumped
+# the version; bump again once they're in, or a page another worker
+# rendered in between would keep getting 304s without them
+activity_sink.subscribe(versions.bump)
+
+# reports are answered from memory until the user writes something
+report_cache = ReportCache(REPORT_CACHE_ENTRIES, REPORT_CACHE_MAX_BYTES, ttl=REPORT_CACHE_TTL)
+versions.subscribe(report_cache.invalidate)
+
 # Helpers
-auth = AuthManager(db_conf)
-goals = GoalManager(db_conf)
-subjects = SubjectManager(db_conf)
-reports = ReportGenerator(db_conf)
-charts = ChartGenerator(db_conf, CHARTS_DIR)
-exporter = DataExporter(db_conf)
+auth = AuthManager(db_pool, activity_sink=activity_sink)
+goals = GoalManager(db_pool)
+subjects = SubjectManager(db_pool)
+reports = ReportGenerator(db_pool, cache=report_cache, versions=versions)
+charts = ChartGenerator(db_pool, CHARTS_DIR, cache_max_bytes=CHART_CACHE_MAX_BYTES)
+exporter = DataExporter(db_pool)
+
+# charts get drawn in the background, pages never wait on matplotlib
+chart_jobs = RenderService(charts, workers=CHART_WORKERS)
+
+# matplotlib is imported on first draw, not at startup (workers that only
+# serve /todo or /login never load it). To pay for it once in the master
+# instead, call this before forking, e.g. gunicorn --preload with
+# TRACKER_WARM_START=1. Cost per module: benchmarks/startup_bench.py
+def warm_start():
+    from modules.chart_render import warm_up
+    warm_up()
+
+if os.environ.get('TRACKER_WARM_START') == '1':
+    warm_start()
+
+# bump data versions before the response goes out
+app.after_request(versions.flush)
+
+# per-request query / template / chart timings, served at /metrics
+init_metrics(app)
+
+def cache_metrics():
+    p = db_pool.stats()
+    c = charts.cache.stats()
+    r = report_cache.stats()
+    a = activity_sink.stats
+    return [
+        ('app_db_pool_open', 'gauge', 'Open DB connections in this worker', p['open']),
+        ('app_db_pool_idle', 'gauge', 'Idle DB connections in this worker', p['idle']),
+        ('app_db_pool_waits_total', 'counter', 'Checkouts that had to wait for a connection', p['waits']),
+        ('app_db_pool_timeouts_total', 'counter', 'Checkouts that gave up waiting', p['timeouts']),
+        ('app_chart_cache_hits_total', 'counter', 'Chart renders skipped, data unchanged', c['hits']),
+        ('app_chart_cache_misses_total', 'counter', 'Charts that had to be drawn', c['misses']),
+        ('app_chart_cache_evictions_total', 'counter', 'Chart PNGs removed by the size cap', c['evictions']),
+        ('app_chart_cache_bytes', 'gauge', 'Bytes of chart PNGs on disk', c['bytes']),
+        ('app_report_cache_hits_total', 'counter', 'Reports served from memory', r['hits']),
+        ('app_report_cache_misses_total', 'counter', 'Reports computed from the DB', r['misses']),
+        ('app_report_cache_evictions_total', 'counter', 'Reports dropped by the LRU limits', r['evictions']),
+        ('app_report_cache_expirations_total', 'counter', 'Reports dropped by TTL', r['expirations']),
+        ('app_report_cache_invalidations_total', 'counter', 'Reports dropped after a write', r['invalidations']),
+        ('app_report_cache_entries', 'gauge', 'Reports held in memory', r['entries']),
+        ('app_activity_flushed_total', 'counter', 'Activity rows written by the background sink', a['flushed']),
+        ('app_activity_sync_writes_total', 'counter', 'Activity rows written inline because the buffer was full', a['sync_writes']),
+        ('app_activity_errors_total', 'counter', 'Failed activity flushes', a['errors'])
+    ]
+
+register_collector(cache_metrics)
+
+@app.teardown_request
+def flush_versions(exc):
+    # a view that blew up after writing doesn't get to after_request
+    versions.flush()
+
+# changes on every deploy, templates or Python, so pages rendered by the
+# old code don't keep getting 304s: the git revision plus the newest
+# template / module mtime (the same in every worker, unlike a start time)
+def _code_stamp():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=app.root_path,
+                             capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        rev = ''
+    paths = [os.path.join(app.root_path, 'app.py')]
+    for folder in ('templates', 'modules'):
+        paths += [os.path.join(d, f) for d, _, files in os.walk(os.path.join(app.root_path, folder))
+                  for f in files if not f.endswith('.pyc')]
+    return f"{rev}:{max((os.path.getmtime(p) for p in paths), default=0)}"
+
+CODE_STAMP = _code_stamp()
 
 # Decorator
 def login_required(f):
@@ -45,6 +179,31 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def etag_view(f):
+    # Conditional GET for pages that only depend on the user's own data:
+    # the ETag is built from their data version, so while nothing has been
+    # written the browser's copy is confirmed with a 304 and the view
+    # (and all its queries) never runs. Goes under @login_required.
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if '_flashes' in session:
+            # a message is waiting to be shown, this render is one-off
+            return f(*args, **kwargs)
+
+        uid = session['user_id']
+        raw = f"{request.endpoint}|{uid}|{versions.get(uid)}|{request.full_path}|{date.today()}|{CODE_STAMP}|{app.config['CLIENT_SIDE_CHARTS']}"
+        tag = hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+        if request.if_none_match.contains_weak(tag):
+            resp = Response(status=304)
+        else:
+            resp = app.make_response(f(*args, **kwargs))
+        resp.set_etag(tag, weak=True)
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True   # always revalidate
+        return resp
+    return decorated_function
+
 # --- Auth ---
 
 @app.route('/')
@@ -104,17 +263,20 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@etag_view
 def dashboard():
     uid = session['user_id']
     
-    # Refresh charts
-    charts.generate_goal_completion_chart(uid)
-    charts.generate_weekly_progress_chart(uid)
-    charts.generate_subject_performance_chart(uid)
+    # Queue a refresh, template shows the last good PNG until it's done
+    # (nothing to do server side when the browser draws them)
+    chart_status = None
+    if not app.config['CLIENT_SIDE_CHARTS']:
+        chart_status = chart_jobs.request_many(uid, DASHBOARD_CHARTS)
     
     return render_template('dashboard.html', 
+        chart_status=chart_status,
         stats=goals.get_user_stats(uid),
-        activities=auth.get_recent_activities(uid, limit=10),
+        activities=auth.get_recent_activities(uid, limit=10)[0],
         deadlines=goals.get_upcoming_deadlines(uid, days=7),
         streak=auth.get_streak_info(uid)
     )
@@ -124,8 +286,12 @@ def dashboard():
 @login_required
 def goals_view():
     uid = session['user_id']
+    # ?after=<cursor>&n=<page size>, see modules/paging.py
+    rows, next_cursor = goals.get_user_goals(uid, after=request.args.get('after'),
+                                             limit=request.args.get('n', type=int))
     return render_template('goals.html', 
-        goals=goals.get_user_goals(uid), 
+        goals=rows, 
+        next_cursor=next_cursor,
         subjects=subjects.get_user_subjects(uid)
     )
 
@@ -225,6 +391,7 @@ def log_progress(subject_id):
 
 @app.route('/reports', endpoint='reports')
 @login_required
+@etag_view
 def reports_view():
     uid = session['user_id']
     return render_template('reports.html', 
@@ -235,6 +402,7 @@ def reports_view():
 
 @app.route('/badges', endpoint='badges')
 @login_required
+@etag_view
 def badges_view():
     uid = session['user_id']
     return render_template('badges.html', 
@@ -251,47 +419,132 @@ def profile():
         stats=goals.get_user_stats(uid)
     )
 
+@app.route('/charts/status')
+@login_required
+def chart_status():
+    # polled by the dashboard while charts are rendering
+    uid = session['user_id']
+    wanted = request.args.get('types')
+    types = [t for t in wanted.split(',') if t in CHART_TYPES] if wanted else DASHBOARD_CHARTS
+
+    out = {}
+    for t in types:
+        st = chart_jobs.status(uid, t)
+        st['url'] = url_for('chart_png', chart_type=t, version=st['version']) if st['version'] else None
+        out[t] = st
+    return jsonify(out)
+
+@app.route('/api/charts')
+@login_required
+@etag_view
+def chart_data():
+    # same queries as the PNG charts, just returned as JSON
+    uid = session['user_id']
+    wanted = request.args.get('types')
+    types = [t for t in wanted.split(',') if t in CHART_TYPES] if wanted else CHART_TYPES
+    return jsonify({t: charts.fetch(t, uid) for t in types})
+
+@app.route('/charts/<chart_type>/<version>.png')
+@login_required
+def chart_png(chart_type, version):
+    # version is the digest of the data the PNG was drawn from, so a given
+    # URL always means the same bytes and can be cached as immutable
+    uid = session['user_id']
+    if chart_type not in CHART_TYPES:
+        abort(404)
+    path = os.path.abspath(charts.chart_path(chart_type, uid))
+    current = charts.cache.current(path)
+    if not current:
+        abort(404)
+    if current[:12] != version:
+        # old link (re-rendered since), point at the current one
+        resp = redirect(url_for('chart_png', chart_type=chart_type, version=current[:12]))
+        resp.cache_control.no_store = True
+        return resp
+
+    resp = send_file(path, mimetype='image/png', etag=current[:12], max_age=CHART_MAX_AGE)
+    resp.cache_control.private = True
+    resp.cache_control.public = False
+    resp.cache_control.immutable = True
+    return resp
+
+@app.route('/charts/<chart_type>/render', methods=['POST'])
+@login_required
+def request_chart(chart_type):
+    if chart_type not in CHART_TYPES:
+        return jsonify({'error': 'Unknown chart'}), 404
+    return jsonify(chart_jobs.request(session['user_id'], chart_type))
+
 # --- EXPORTS (Split up to fix template errors) ---
 
+def stream_download(gen, filename, fallback, mimetype='text/csv', headers=None):
+    # Pull the first chunk (header) here so a failing query can still
+    # redirect with a message; after that the rows are streamed.
+    try:
+        first = next(gen)
+    except Exception as e:
+        print(f"Export error: {e}")
+        flash('Export failed', 'error')
+        return redirect(url_for(fallback))
+
+    def body():
+        yield first
+        yield from gen
+
+    headers = dict(headers or {})
+    headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return Response(stream_with_context(body()), mimetype=mimetype, headers=headers)
+
+def delta_download(uid, dataset, filename, fallback):
+    # ?delta=1 -> only rows since the last delta export (or since=...);
+    # where to carry on from next time is in the X-Export-* headers
+    try:
+        gen, manifest = exporter.stream_delta_csv(uid, dataset, request.args.get('since'))
+    except Exception as e:
+        print(f"Export error: {e}")
+        flash('Export failed', 'error')
+        return redirect(url_for(fallback))
+
+    headers = {f'X-Export-{k.title()}': str(v) for k, v in manifest.items() if k != 'file' and v is not None}
+    return stream_download(gen, filename, fallback, headers=headers)
+
 @app.route('/export/goals')
 @login_required
 def export_goals():
-    uid = session['user_id']
-    f = exporter.export_goals_csv(uid)
-    if f:
-        return send_file(f, as_attachment=True, download_name='my_goals.csv')
-    flash('Export failed', 'error')
-    return redirect(url_for('goals'))
+    if request.args.get('delta'):
+        return delta_download(session['user_id'], 'goals', 'my_goals_delta.csv', 'goals')
+    return stream_download(exporter.stream_goals_csv(session['user_id']), 'my_goals.csv', 'goals')
 
 @app.route('/export/progress')
 @login_required
 def export_progress():
-    uid = session['user_id']
-    f = exporter.export_progress_csv(uid)
-    if f:
-        return send_file(f, as_attachment=True, download_name='my_progress.csv')
-    flash('Export failed', 'error')
-    return redirect(url_for('subjects'))
+    if request.args.get('delta'):
+        return delta_download(session['user_id'], 'progress', 'my_progress_delta.csv', 'subjects')
+    return stream_download(exporter.stream_progress_csv(session['user_id']), 'my_progress.csv', 'subjects')
 
 @app.route('/export/reports')
 @login_required
 def export_reports():
-    uid = session['user_id']
-    f = exporter.export_reports_csv(uid)
-    if f:
-        return send_file(f, as_attachment=True, download_name='my_reports.csv')
-    flash('Export failed', 'error')
-    return redirect(url_for('reports'))
+    return stream_download(exporter.stream_reports_csv(session['user_id']), 'my_reports.csv', 'reports')
 
 @app.route('/export/all')
 @login_required
 def export_all():
-    uid = session['user_id']
-    f = exporter.export_all_data(uid)
-    if f:
-        return send_file(f, as_attachment=True, download_name='student_data.zip')
-    flash('Export failed', 'error')
-    return redirect(url_for('profile'))
+    gen = exporter.stream_all_zip(session['user_id'])
+    return stream_download(gen, 'student_data.zip', 'profile', mimetype='application/zip')
+
+@app.route('/export/delta')
+@login_required
+def export_delta():
+    # new rows only for goals + progress, with a manifest.json for merging
+    since = {d: request.args[f'{d}_since'] for d in exporter.DELTA_DATASETS if f'{d}_since' in request.args}
+    try:
+        gen = exporter.stream_delta_zip(session['user_id'], since)
+    except Exception as e:
+        print(f"Export error: {e}")
+        flash('Export failed', 'error')
+        return redirect(url_for('profile'))
+    return stream_download(gen, 'student_data_delta.zip', 'profile', mimetype='application/zip')
 
 # --- Tools ---
 
@@ -320,7 +573,9 @@ def log_study_session():
 @app.route('/todo', methods=['GET'])
 @login_required
 def todo():
-    return render_template('todo.html', tasks=auth.get_user_todos(session['user_id']))
+    rows, next_cursor = auth.get_user_todos(session['user_id'], after=request.args.get('after'),
+                                            limit=request.args.get('n', type=int))
+    return render_template('todo.html', tasks=rows, next_cursor=next_cursor)
 
 @app.route('/todo/add', methods=['POST'])
 @login_required
@@ -334,6 +589,41 @@ def toggle_todo(task_id):
     auth.toggle_todo(task_id, session['user_id'])
     return redirect(url_for('todo'))
 
+# --- Admin ---
+
+@app.route('/admin/slow-queries')
+def slow_queries():
+    if not admin_allowed():
+        return admin_denied()
+    entries = db_pool.slow_log.recent(limit=request.args.get('n', 100, type=int))
+    if not app.config['SLOW_QUERY_SHOW_PARAMS']:
+        for e in entries:
+            e['params'] = 'redacted'
+    return render_template('admin_slow_queries.html',
+        entries=entries,
+        threshold_ms=SLOW_QUERY_MS,
+        log_path=SLOW_QUERY_LOG
+    )
+
+# --- Maintenance ---
+
+@app.cli.command('rebuild-study-totals')
+def rebuild_study_totals():
+    """Recompute study_totals from study_sessions."""
+    resp = subjects.rebuild_study_totals()
+    if resp['success']:
+        versions.bump_all()
+    print('study_totals rebuilt' if resp['success'] else f"Rebuild failed: {resp['message']}")
+
+@app.cli.command('rebuild-rollups')
+@click.option('--days', type=int, default=None, help='Only recompute the last N days')
+def rebuild_rollups(days):
+    """Recompute daily_rollups from the raw tables."""
+    resp = reports.rebuild_rollups(days=days)
+    if resp['success']:
+        versions.bump_all()
+    print('daily_rollups rebuilt' if resp['success'] else f"Rebuild failed: {resp['message']}")
+
 if __name__ == '__main__':
     if not os.path.exists(CHARTS_DIR):
         os.makedirs(CHARTS_DIR)
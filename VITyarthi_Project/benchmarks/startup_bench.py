@@ -0,0 +1,105 @@
+"""Startup benchmark: what a fresh worker pays to import the app.
+
+Imports app.py in a new interpreter --runs times (python -X importtime)
+and prints the median wall time plus the median cumulative import time of
+every modules.* module and of the heaviest third-party packages. Then, in
+one more fresh process, times the matplotlib warm-up and the first chart
+drawn after it, i.e. what the lazy chart import moves off worker start.
+
+matplotlib must not show up in the import list: it's only loaded by
+modules.chart_render when a chart gets drawn (or by warm_start()).
+
+Run from VITyarthi_Project/ (no database needed, nothing connects):
+    python benchmarks/startup_bench.py --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import app
+print(time.perf_counter() - t)
+"""
+
+CHART_SNIPPET = """
+import json, time, tempfile, os
+t = time.perf_counter()
+import app
+imported = time.perf_counter() - t
+t = time.perf_counter()
+app.warm_start()
+warm = time.perf_counter() - t
+from modules.charts import draw_chart
+t = time.perf_counter()
+draw_chart('weekly_progress', {'dates': ['01/01', '01/02'], 'vals': [1, 2]},
+           os.path.join(tempfile.mkdtemp(), 'bench.png'))
+first = time.perf_counter() - t
+print(json.dumps({'import': imported, 'warm_start': warm, 'first_chart': first}))
+"""
+
+
+def run(snippet, importtime=False):
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', snippet]
+    p = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if p.returncode != 0:
+        sys.exit(p.stderr)
+    return p.stdout.strip().splitlines()[-1], p.stderr
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package" -> {name: seconds}
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        out[name.strip()] = int(cumulative) / 1e6
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--runs', type=int, default=5)
+    ap.add_argument('--top', type=int, default=10, help='third-party packages to list')
+    args = ap.parse_args()
+
+    walls, per_module = [], {}
+    for _ in range(args.runs):
+        wall, stderr = run(IMPORT_SNIPPET, importtime=True)
+        walls.append(float(wall))
+        for name, secs in parse_importtime(stderr).items():
+            per_module.setdefault(name, []).append(secs)
+
+    cost = {name: median(v) for name, v in per_module.items()}
+    ms = lambda s: f'{s * 1000:8.1f} ms'
+
+    print(f"import app (wall, median of {args.runs}): {ms(median(walls))}")
+    print("\nour modules (cumulative):")
+    for name in sorted(n for n in cost if n.startswith('modules.')):
+        print(f"  {name:<28}{ms(cost[name])}")
+
+    third_party = {n: c for n, c in cost.items()
+                   if '.' not in n and not n.startswith('_') and n not in getattr(sys, 'stdlib_module_names', ()) and n not in ('app', 'modules')}
+    print("\nheaviest third-party packages (cumulative):")
+    for name, c in sorted(third_party.items(), key=lambda x: -x[1])[:args.top]:
+        print(f"  {name:<28}{ms(c)}")
+
+    if 'matplotlib' in cost:
+        print("\nWARNING: matplotlib is imported at startup again")
+
+    line, _ = run(CHART_SNIPPET)
+    t = json.loads(line)
+    print(f"\nwarm_start() (matplotlib, style, fonts): {ms(t['warm_start'])}")
+    print(f"first chart after warm-up:               {ms(t['first_chart'])}")
+    sys.exit(1 if 'matplotlib' in cost else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Regression benchmark for the per-subject summary queries.
+
+Seeds a throwaway user with one subject that has N progress logs and N
+study sessions, then times ReportGenerator.generate_subject_summary and
+SubjectManager.get_user_subjects_with_progress and checks the totals.
+With the old logs x sessions join the time grew ~N^2 and study minutes
+came out N times too big; now both should grow roughly linearly.
+
+Run from VITyarthi_Project/ against a scratch database:
+    python benchmarks/subject_summary_bench.py --password ... --sizes 100 1000
+or with no MySQL server at all, against a SQLite file:
+    python benchmarks/subject_summary_bench.py --sqlite /tmp/bench.db
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.db_pool import ConnectionPool
+from modules.sqlite_backend import SQLitePool
+from modules.reports import ReportGenerator
+from modules.subjects import SubjectManager
+
+SESSION_MINS = 25
+MARKS = 80
+
+
+def seed(pool, n):
+    tag = f"bench_{os.getpid()}_{n}_{int(time.time())}"
+    with pool.connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO users (username, email, pwd_hash, joined_at, last_login, streak) VALUES (%s, %s, 'x', NOW(), NOW(), 0)",
+                (tag, f"{tag}@bench.local")
+            )
+            uid = cur.lastrowid
+            cur.execute("INSERT INTO subjects (uid, name, added_on) VALUES (%s, 'Benchmark', NOW())", (uid,))
+            sid = cur.lastrowid
+            # two goals on the same subject name, used to double the log totals
+            cur.executemany(
+                "INSERT INTO goals (uid, subject, target_score, due_date, progress, status, created_at) VALUES (%s, 'Benchmark', 90, CURDATE(), %s, 'In Progress', NOW())",
+                [(uid, 10), (uid, 20)]
+            )
+
+            now = datetime.now()
+            cur.executemany(
+                "INSERT INTO progress_logs (gid, sid, marks, logged_at, notes) VALUES (NULL, %s, %s, %s, '')",
+                [(sid, MARKS, now - timedelta(minutes=i)) for i in range(n)]
+            )
+            cur.executemany(
+                "INSERT INTO study_sessions (uid, sid, duration_mins, sess_date) VALUES (%s, %s, %s, %s)",
+                [(uid, sid, SESSION_MINS, now - timedelta(minutes=i)) for i in range(n)]
+            )
+        conn.commit()
+    return uid
+
+
+def cleanup(pool, uid):
+    with pool.connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM progress_logs WHERE sid IN (SELECT sid FROM subjects WHERE uid = %s)", (uid,))
+            cur.execute("DELETE FROM study_sessions WHERE uid = %s", (uid,))
+            cur.execute("DELETE FROM users WHERE uid = %s", (uid,))   # cascades the rest
+        conn.commit()
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        took = time.perf_counter() - t
+        best = took if best is None else min(best, took)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--host', default='localhost')
+    ap.add_argument('--user', default='root')
+    ap.add_argument('--password', default='')
+    ap.add_argument('--database', default='student_tracker_db')
+    ap.add_argument('--sqlite', metavar='PATH', help='use a SQLite file instead of MySQL')
+    ap.add_argument('--sizes', type=int, nargs='+', default=[100, 1000])
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    if args.sqlite:
+        pool = SQLitePool(args.sqlite)
+    else:
+        pool = ConnectionPool({'host': args.host, 'user': args.user,
+                               'password': args.password, 'database': args.database}, size=2)
+    reports = ReportGenerator(pool)
+    subjects = SubjectManager(pool)
+
+    timings = {}
+    ok = True
+    for n in args.sizes:
+        uid = seed(pool, n)
+        try:
+            subjects.rebuild_study_totals(uid)
+
+            t_sum, summary = best_of(lambda: reports.generate_subject_summary(uid), args.repeat)
+            t_prog, progress = best_of(lambda: subjects.get_user_subjects_with_progress(uid), args.repeat)
+            timings[n] = (t_sum, t_prog)
+
+            row, prow = summary[0], progress[0]
+            checks = {
+                'summary.total_logs': (row['total_logs'], n),
+                'summary.study_minutes': (int(row['study_minutes']), n * SESSION_MINS),
+                'progress.total_logs': (prow['total_logs'], n),
+                'progress.total_marks': (float(prow['total_marks']), float(n * MARKS)),
+            }
+            for name, (got, want) in checks.items():
+                if got != want:
+                    ok = False
+                    print(f"  WRONG {name}: got {got}, expected {want}")
+
+            print(f"n={n:>6}  subject_summary {t_sum * 1000:8.2f} ms   subjects_with_progress {t_prog * 1000:8.2f} ms")
+        finally:
+            cleanup(pool, uid)
+
+    sizes = sorted(timings)
+    if len(sizes) >= 2:
+        lo, hi = sizes[0], sizes[-1]
+        for i, name in enumerate(('subject_summary', 'subjects_with_progress')):
+            ratio = timings[hi][i] / timings[lo][i] if timings[lo][i] else float('inf')
+            print(f"{name}: x{hi / lo:.0f} rows -> x{ratio:.1f} time")
+
+    pool.close_all()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
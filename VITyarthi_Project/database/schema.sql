@@ -10,6 +10,9 @@ CREATE TABLE users (
     joined_at       DATETIME DEFAULT CURRENT_TIMESTAMP,
     last_login      DATETIME,
     streak          INT DEFAULT 0,
+    -- bumped after every write, feeds the page ETags (modules/data_version.py)
+    -- existing installs: ALTER TABLE users ADD data_version BIGINT UNSIGNED NOT NULL DEFAULT 0;
+    data_version    BIGINT UNSIGNED NOT NULL DEFAULT 0,
     
     UNIQUE KEY (username)
 ) ENGINE=InnoDB;
@@ -37,10 +40,15 @@ CREATE TABLE goals (
     due_date        DATE NOT NULL,
     description     TEXT,
     created_at      DATETIME DEFAULT CURRENT_TIMESTAMP,
+    -- delta exports pick up edited goals by this (see modules/exports.py)
+    updated_at      DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
 
     FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE,
     -- Composite index for the dashboard "upcoming" query
-    INDEX idx_dashboard (uid, status, due_date)
+    INDEX idx_dashboard (uid, status, due_date),
+    INDEX idx_changed (uid, updated_at),
+    -- keyset paging on the goals page (modules/paging.py)
+    INDEX idx_listing (uid, created_at, gid)
 ) ENGINE=InnoDB;
 
 -- Tracking logs
@@ -72,6 +80,38 @@ CREATE TABLE study_sessions (
     INDEX idx_analytics (uid, sid, duration_mins)
 ) ENGINE=InnoDB;
 
+-- Running study time totals, maintained by SubjectManager.log_study_session
+-- in the same transaction as the session insert. sid = 0 holds the user's
+-- total over all subjects. Existing installs: create the table, then run
+--   flask --app app rebuild-study-totals
+CREATE TABLE study_totals (
+    uid             INT UNSIGNED NOT NULL,
+    sid             INT UNSIGNED NOT NULL DEFAULT 0,
+    total_mins      BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    sessions        INT UNSIGNED NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (uid, sid),
+    FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Per user, per day counters behind the weekly/monthly reports
+-- (see modules/rollups.py). Bumped on write; rebuild / compact with
+--   flask --app app rebuild-rollups [--days N]
+CREATE TABLE daily_rollups (
+    uid             INT UNSIGNED NOT NULL,
+    day             DATE NOT NULL,
+    study_mins      INT UNSIGNED NOT NULL DEFAULT 0,
+    study_sessions  INT UNSIGNED NOT NULL DEFAULT 0,
+    progress_logs   INT UNSIGNED NOT NULL DEFAULT 0,
+    marks_sum       DECIMAL(12,2) NOT NULL DEFAULT 0,
+    marks_count     INT UNSIGNED NOT NULL DEFAULT 0,
+    goals_updated   INT UNSIGNED NOT NULL DEFAULT 0,
+    badges_earned   INT UNSIGNED NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (uid, day),
+    FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 -- Badge system
 CREATE TABLE badges (
     bid             INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
@@ -96,6 +136,23 @@ CREATE TABLE activity_logs (
     INDEX idx_timeline (uid, ts DESC)
 ) ENGINE=InnoDB;
 
+-- How far each user's delta export of a dataset has got.
+-- goals use last_ts (updated_at), progress uses last_id (log_id).
+-- Existing installs:
+--   ALTER TABLE goals ADD updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+--     ADD INDEX idx_changed (uid, updated_at);
+CREATE TABLE export_watermarks (
+    uid             INT UNSIGNED NOT NULL,
+    dataset         VARCHAR(32) NOT NULL,
+    last_id         BIGINT UNSIGNED,
+    last_ts         DATETIME,
+    exported_at     DATETIME NOT NULL,
+    row_count       INT UNSIGNED NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (uid, dataset),
+    FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 -- Simple Todo
 CREATE TABLE todo_tasks (
     tid             INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
@@ -105,7 +162,8 @@ CREATE TABLE todo_tasks (
     created_at      DATETIME DEFAULT CURRENT_TIMESTAMP,
 
     FOREIGN KEY (uid) REFERENCES users(uid) ON DELETE CASCADE,
-    INDEX idx_pending (uid, is_done)
+    INDEX idx_pending (uid, is_done),
+    INDEX idx_listing (uid, created_at, tid)
 ) ENGINE=InnoDB;
 
 -- Static data for motivation widget
@@ -0,0 +1,172 @@
+-- SQLite version of schema.sql, for DB_BACKEND = 'sqlite' (modules/sqlite_backend.py).
+-- Same tables, columns and indexes. Differences:
+--   * AUTO_INCREMENT -> INTEGER PRIMARY KEY AUTOINCREMENT (ids never reused,
+--     the progress delta export relies on that)
+--   * ENUMs -> CHECK constraints
+--   * defaults use local time, like NOW() in the queries
+--   * goals.updated_at is kept current by a trigger instead of ON UPDATE
+-- SQLitePool runs this on startup; everything is IF NOT EXISTS.
+
+-- Users table
+CREATE TABLE IF NOT EXISTS users (
+    uid             INTEGER PRIMARY KEY AUTOINCREMENT,
+    username        VARCHAR(50) NOT NULL UNIQUE,
+    email           VARCHAR(100) NOT NULL UNIQUE,
+    pwd_hash        VARCHAR(255) NOT NULL,
+    joined_at       DATETIME DEFAULT (datetime('now', 'localtime')),
+    last_login      DATETIME,
+    streak          INT DEFAULT 0,
+    -- bumped after every write, feeds the page ETags (modules/data_version.py)
+    data_version    BIGINT NOT NULL DEFAULT 0
+);
+
+-- Subjects (lookup table)
+CREATE TABLE IF NOT EXISTS subjects (
+    sid             INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    name            VARCHAR(64) NOT NULL,
+    added_on        DATETIME DEFAULT (datetime('now', 'localtime')),
+
+    CONSTRAINT uk_user_sub UNIQUE (uid, name)
+);
+
+-- Core goals
+CREATE TABLE IF NOT EXISTS goals (
+    gid             INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    subject         VARCHAR(100) NOT NULL,
+    target_score    DECIMAL(5,2) NOT NULL CHECK (target_score <= 100),
+    progress        INT DEFAULT 0 CHECK (progress BETWEEN 0 AND 100),
+    status          VARCHAR(16) DEFAULT 'Pending' CHECK (status IN ('Pending', 'In Progress', 'Completed')),
+    due_date        DATE NOT NULL,
+    description     TEXT,
+    created_at      DATETIME DEFAULT (datetime('now', 'localtime')),
+    -- delta exports pick up edited goals by this (see modules/exports.py)
+    updated_at      DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+-- Composite index for the dashboard "upcoming" query
+CREATE INDEX IF NOT EXISTS idx_dashboard ON goals (uid, status, due_date);
+CREATE INDEX IF NOT EXISTS idx_changed ON goals (uid, updated_at);
+-- keyset paging on the goals page (modules/paging.py)
+CREATE INDEX IF NOT EXISTS idx_listing ON goals (uid, created_at, gid);
+
+-- ON UPDATE CURRENT_TIMESTAMP
+CREATE TRIGGER IF NOT EXISTS goals_touch AFTER UPDATE ON goals
+FOR EACH ROW WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE goals SET updated_at = datetime('now', 'localtime') WHERE gid = NEW.gid;
+END;
+
+-- Tracking logs
+-- NOTE: no cascade delete here so we keep history even if goal is deleted
+CREATE TABLE IF NOT EXISTS progress_logs (
+    log_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    gid             INT REFERENCES goals(gid) ON DELETE SET NULL,
+    sid             INT NOT NULL REFERENCES subjects(sid),
+    marks           DECIMAL(5,2),
+    logged_at       DATETIME DEFAULT (datetime('now', 'localtime')),
+    notes           TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recent ON progress_logs (sid, logged_at);
+
+-- Timer sessions
+CREATE TABLE IF NOT EXISTS study_sessions (
+    sess_id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    sid             INT NOT NULL REFERENCES subjects(sid),
+    duration_mins   INT NOT NULL CHECK (duration_mins > 0),
+    sess_date       DATETIME NOT NULL
+);
+-- helps calc total study time per subject
+CREATE INDEX IF NOT EXISTS idx_analytics ON study_sessions (uid, sid, duration_mins);
+
+-- Running study time totals (sid = 0 is the user's total), see schema.sql
+CREATE TABLE IF NOT EXISTS study_totals (
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    sid             INT NOT NULL DEFAULT 0,
+    total_mins      BIGINT NOT NULL DEFAULT 0,
+    sessions        INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (uid, sid)
+);
+
+-- Per user, per day counters behind the weekly/monthly reports (modules/rollups.py)
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    day             DATE NOT NULL,
+    study_mins      INT NOT NULL DEFAULT 0,
+    study_sessions  INT NOT NULL DEFAULT 0,
+    progress_logs   INT NOT NULL DEFAULT 0,
+    marks_sum       DECIMAL(12,2) NOT NULL DEFAULT 0,
+    marks_count     INT NOT NULL DEFAULT 0,
+    goals_updated   INT NOT NULL DEFAULT 0,
+    badges_earned   INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (uid, day)
+);
+
+-- Badge system
+CREATE TABLE IF NOT EXISTS badges (
+    bid             INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    badge_name      VARCHAR(100) NOT NULL,
+    type            VARCHAR(16) NOT NULL CHECK (type IN ('streak', 'achievement', 'special')),
+    earned_on       DATETIME DEFAULT (datetime('now', 'localtime')),
+
+    CONSTRAINT uk_one_badge UNIQUE (uid, badge_name)
+);
+
+-- Audit trail / Activity
+CREATE TABLE IF NOT EXISTS activity_logs (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    act_type        VARCHAR(32) NOT NULL,
+    details         TEXT,
+    ts              DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_timeline ON activity_logs (uid, ts DESC);
+
+-- How far each user's delta export of a dataset has got
+CREATE TABLE IF NOT EXISTS export_watermarks (
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    dataset         VARCHAR(32) NOT NULL,
+    last_id         BIGINT,
+    last_ts         DATETIME,
+    exported_at     DATETIME NOT NULL,
+    row_count       INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (uid, dataset)
+);
+
+-- Simple Todo
+CREATE TABLE IF NOT EXISTS todo_tasks (
+    tid             INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid             INT NOT NULL REFERENCES users(uid) ON DELETE CASCADE,
+    task            VARCHAR(255) NOT NULL,
+    is_done         TINYINT(1) DEFAULT 0,
+    created_at      DATETIME DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_pending ON todo_tasks (uid, is_done);
+CREATE INDEX IF NOT EXISTS idx_todo_listing ON todo_tasks (uid, created_at, tid);
+
+-- Static data for motivation widget
+CREATE TABLE IF NOT EXISTS motivation_messages (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    msg             TEXT NOT NULL,
+    cat             VARCHAR(32) DEFAULT 'general'
+);
+
+-- Initial seed (first run only)
+INSERT INTO motivation_messages (msg, cat)
+SELECT msg, cat FROM (
+    SELECT 'Keep going! Every small step counts.' AS msg, 'encouragement' AS cat
+    UNION ALL SELECT 'You are capable of amazing things.', 'confidence'
+    UNION ALL SELECT 'Success is the sum of small efforts.', 'persistence'
+    UNION ALL SELECT 'The expert in anything was once a beginner.', 'growth'
+    UNION ALL SELECT 'Stay focused!', 'motivation'
+    UNION ALL SELECT 'Progress, not perfection.', 'encouragement'
+    UNION ALL SELECT 'Dream big, work hard.', 'motivation'
+    UNION ALL SELECT 'You are stronger than you think!', 'confidence'
+    UNION ALL SELECT 'Consistency is key.', 'persistence'
+)
+WHERE NOT EXISTS (SELECT 1 FROM motivation_messages);
@@ -1,3 +1,10 @@
+# DB plumbing
+from .db_pool import ConnectionPool, PoolTimeout
+from .sqlite_backend import SQLitePool
+from .activity_sink import ActivitySink
+from .data_version import DataVersions
+from .slow_query import SlowQueryLog
+
 # Core Logic
 from .auth import AuthManager
 from .goals import GoalManager
@@ -5,14 +12,26 @@ from .subjects import SubjectManager
 
 # Generators & Utils
 from .reports import ReportGenerator
+from .report_cache import ReportCache
 from .charts import ChartGenerator
+from .chart_cache import ChartCache
+from .render_service import RenderService
 from .exports import DataExporter
 
 __all__ = [
+    'ConnectionPool',
+    'PoolTimeout',
+    'SQLitePool',
+    'ActivitySink',
+    'DataVersions',
+    'SlowQueryLog',
     'AuthManager',
     'GoalManager',
     'SubjectManager',
     'ReportGenerator',
+    'ReportCache',
     'ChartGenerator',
+    'ChartCache',
+    'RenderService',
     'DataExporter'
 ]
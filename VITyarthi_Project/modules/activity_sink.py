@@ -0,0 +1,196 @@
+import os
+import time
+import atexit
+import threading
+from datetime import datetime
+from mysql.connector.errors import IntegrityError, DataError
+
+INSERT_SQL = "INSERT INTO activity_logs (uid, act_type, details, ts) VALUES (%s, %s, %s, %s)"
+
+
+class ActivitySink:
+    # Write-behind buffer for activity_logs.
+    # log_activity() only appends to an in-memory list; a background
+    # thread flushes it as one multi-row INSERT once batch_size events are
+    # waiting or every flush_interval seconds, whichever comes first.
+    # The buffer is bounded: when it's full callers wait up to put_timeout
+    # and then write their row themselves (backpressure instead of
+    # unbounded memory).
+    def __init__(self, pool, batch_size=100, flush_interval=2.0, max_pending=10000, put_timeout=0.5):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+
+        self._cond = threading.Condition()
+        self._buf = []          # waiting to be flushed
+        self._inflight = []     # batches being written (flusher and/or flush()), not committed yet
+        self._pid = None
+        self._thread = None
+        self._stopping = False
+        self._listeners = []
+
+        self.stats = {'queued': 0, 'flushed': 0, 'batches': 0, 'sync_writes': 0, 'errors': 0}
+        atexit.register(self.close)
+
+    def subscribe(self, fn):
+        # fn(uids) is called from the flusher once those users' rows are
+        # committed (e.g. DataVersions.bump: pages rendered by another
+        # worker before the flush mustn't stay valid under the new version)
+        self._listeners.append(fn)
+
+    def _notify(self, uids):
+        for fn in self._listeners:
+            try:
+                fn(uids)
+            except Exception as e:
+                print(f"Activity listener error: {e}")
+
+    def _ensure_thread(self):
+        # (re)start the flusher in this process, forked workers don't
+        # inherit threads
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._buf = []
+            self._inflight = []
+            self._thread = threading.Thread(target=self._loop, name='activity-sink', daemon=True)
+            self._thread.start()
+
+    def add(self, uid, act_type, desc, ts=None):
+        # whole seconds, as the DATETIME column keeps it, so a buffered event
+        # and its stored row compare equal (see get_recent_activities)
+        ev = (uid, act_type, desc, ts or datetime.now().replace(microsecond=0))
+
+        with self._cond:
+            self._ensure_thread()
+            if len(self._buf) >= self.max_pending:
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: len(self._buf) < self.max_pending, timeout=self.put_timeout)
+
+            if len(self._buf) < self.max_pending and not self._stopping:
+                self._buf.append(ev)
+                self.stats['queued'] += 1
+                if len(self._buf) >= self.batch_size:
+                    self._cond.notify_all()
+                return
+
+            self.stats['sync_writes'] += 1
+
+        # still full (or shutting down): write it ourselves. Like the
+        # unbuffered log_activity, a failed log must not fail the request
+        try:
+            self._write([ev])
+        except Exception as e:
+            print(f"Activity write error: {e}")
+            with self._cond:
+                self.stats['errors'] += 1
+
+    def pending(self, uid):
+        # events for this user that aren't in the table yet, newest first
+        # (read-your-writes for get_recent_activities)
+        with self._cond:
+            evs = [e for batch in self._inflight + [self._buf] for e in batch if e[0] == uid]
+        evs.reverse()   # so same-second events stay newest first as well
+        evs.sort(key=lambda e: e[3], reverse=True)
+        return evs
+
+    def _write(self, batch):
+        # executemany on a plain INSERT ... VALUES is sent as one
+        # multi-row statement by mysql.connector
+        with self.pool.connect() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(INSERT_SQL, batch)
+            conn.commit()
+
+    def _take(self):
+        with self._cond:
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._buf) < self.batch_size and not self._stopping:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(timeout=left)
+
+            batch = self._buf[:self.batch_size]
+            del self._buf[:self.batch_size]
+            if batch:
+                self._inflight.append(batch)
+            self._cond.notify_all()
+            return batch
+
+    def _flush_batch(self, batch):
+        try:
+            self._write(batch)
+            with self._cond:
+                self.stats['flushed'] += len(batch)
+                self.stats['batches'] += 1
+            self._notify({ev[0] for ev in batch})
+            return True
+        except (IntegrityError, DataError) as e:
+            # a bad row (e.g. user deleted meanwhile) would fail the batch
+            # forever, so salvage the rest one by one and drop the bad ones
+            print(f"Activity flush error, retrying row by row: {e}")
+            written = []
+            for ev in batch:
+                try:
+                    self._write([ev])
+                    written.append(ev)
+                except Exception as row_err:
+                    print(f"Dropping activity row {ev[:2]}: {row_err}")
+            with self._cond:
+                self.stats['flushed'] += len(written)
+                self.stats['errors'] += 1
+            if written:
+                self._notify({ev[0] for ev in written})
+            return True
+        except Exception as e:
+            # DB away: put them back for the next round if there's room
+            print(f"Activity flush error: {e}")
+            with self._cond:
+                self.stats['errors'] += 1
+                room = self.max_pending - len(self._buf)
+                if room > 0 and not self._stopping:
+                    self._buf[:0] = batch[:room]
+                # under the same lock, so pending() doesn't see them twice
+                self._inflight = [b for b in self._inflight if b is not batch]
+            return False
+        finally:
+            with self._cond:
+                # by identity, another batch may hold equal events
+                self._inflight = [b for b in self._inflight if b is not batch]
+
+    def _loop(self):
+        while True:
+            batch = self._take()
+            if batch:
+                if not self._flush_batch(batch) and not self._stopping:
+                    time.sleep(self.flush_interval)   # don't hammer a dead server
+            elif self._stopping:
+                return
+
+    def flush(self):
+        # write out everything buffered right now (used at shutdown)
+        while True:
+            with self._cond:
+                batch = self._buf[:self.batch_size]
+                del self._buf[:self.batch_size]
+                if batch:
+                    self._inflight.append(batch)
+            if not batch:
+                return
+            # failed batches aren't re-queued once we're stopping, so this ends
+            self._flush_batch(batch)
+
+    def close(self):
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            t = self._thread
+        # the flusher drains the buffer and exits once it's stopping; wait
+        # for it so the batch it's writing isn't cut off at exit
+        if t is not None and t is not threading.current_thread():
+            t.join()
+        self.flush()
@@ -1,6 +1,10 @@
 import mysql.connector
 import hashlib
+from collections import Counter
 from datetime import datetime, timedelta
+from modules.request_memo import memo_read, invalidates
+from modules.rollups import bump_daily
+from modules.paging import page_size, seek, split_page, encode_cursor
 
 # Defined at module level
 BADGE_CONFIG = [
@@ -13,17 +17,21 @@ BADGE_CONFIG = [
 ]
 
 class AuthManager:
-    def __init__(self, db_conf):
-        self.conf = db_conf
+    def __init__(self, pool, activity_sink=None):
+        # shared ConnectionPool (see db_pool.py)
+        self.pool = pool
+        # optional write-behind buffer for log_activity (activity_sink.py)
+        self.activity_sink = activity_sink
         # simple salt
         self._salt = "somesecurestring2024"
 
     def _get_db(self):
-        return mysql.connector.connect(**self.conf)
+        return self.pool.connect()
 
     def _hash(self, raw_pwd):
         return hashlib.sha256((raw_pwd + self._salt).encode()).hexdigest()
 
+    @invalidates
     def register_user(self, user, email, pwd):
         try:
             with self._get_db() as conn:
@@ -52,6 +60,7 @@ class AuthManager:
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
+    @invalidates
     def login_user(self, email, pwd):
         try:
             with self._get_db() as conn:
@@ -78,6 +87,7 @@ class AuthManager:
             print(f"Login failed: {e}")
             return {'success': False, 'message': 'System error during login'}
 
+    @invalidates
     def update_streak(self, uid):
         try:
             with self._get_db() as conn:
@@ -113,17 +123,22 @@ class AuthManager:
         if days in milestones:
             self.award_badge(uid, milestones[days], 'streak')
 
+    @invalidates
     def award_badge(self, uid, name, b_type):
         try:
             with self._get_db() as conn:
                 with conn.cursor() as cur:
                     # UPDATED: earned_on instead of earned_date (from SQL schema)
-                    q = "INSERT IGNORE INTO badges (user_id, badge_name, type, earned_on) VALUES (%s, %s, %s, %s)"
+                    q = "INSERT IGNORE INTO badges (uid, badge_name, type, earned_on) VALUES (%s, %s, %s, %s)"
                     cur.execute(q, (uid, name, b_type, datetime.now()))
+                    # rowcount is 0 when the badge was already there
+                    if cur.rowcount == 1:
+                        bump_daily(cur, uid, badges_earned=1)
                     conn.commit()
         except Exception:
             pass 
 
+    @memo_read
     def get_streak_info(self, uid):
         with self._get_db() as conn:
             with conn.cursor(dictionary=True) as cur:
@@ -132,7 +147,12 @@ class AuthManager:
                 res = cur.fetchone()
                 return res if res else {'study_streak': 0, 'last_login': datetime.now()}
 
+    @invalidates
     def log_activity(self, uid, act_type, desc):
+        if self.activity_sink is not None:
+            self.activity_sink.add(uid, act_type, desc)
+            return
+
         try:
             with self._get_db() as conn:
                 with conn.cursor() as cur:
@@ -145,17 +165,54 @@ class AuthManager:
         except Exception as e: 
             print(e)
 
-    def get_recent_activities(self, uid, limit=10):
+    @memo_read
+    def get_recent_activities(self, uid, limit=10, after=None):
+        # one page of the timeline, newest first: (rows, next cursor)
+        limit = page_size(limit)
+        where, args = ["uid = %s"], [uid]
+        tail = seek(where, args, 'ts', 'id', after, limit)
+        # first page: take the write-behind buffer *before* reading the table,
+        # a batch committed in between then shows up in both (deduped below)
+        # rather than in neither
+        buffered = self.activity_sink.pending(uid)[:limit] if self.activity_sink is not None and not after else []
         with self._get_db() as conn:
             with conn.cursor(dictionary=True) as cur:
                 # Map DB columns back to what template expects
-                cur.execute("""
-                    SELECT act_type as activity_type, details as description, ts as timestamp 
+                cur.execute(f"""
+                    SELECT id, act_type as activity_type, details as description, ts as timestamp 
                     FROM activity_logs 
-                    WHERE uid = %s ORDER BY ts DESC LIMIT %s
-                """, (uid, limit))
-                return cur.fetchall()
+                    WHERE {' AND '.join(where)} {tail}
+                """, args)
+                rows, nxt = split_page(cur.fetchall(), limit, 'timestamp', 'id')
+
+        if not buffered:
+            return rows, nxt
 
+        # each stored row cancels at most one identical buffered event
+        stored = Counter((r['activity_type'], r['description'], r['timestamp']) for r in rows)
+        pending = []
+        for e in buffered:
+            key = (e[1], e[2], e[3])
+            if stored[key]:
+                stored[key] -= 1
+                continue
+            pending.append({'id': None, 'activity_type': e[1], 'description': e[2], 'timestamp': e[3]})
+        if not pending:
+            return rows, nxt
+        merged = pending + rows
+        merged.sort(key=lambda r: r['timestamp'], reverse=True)
+        page = merged[:limit]
+
+        # the next page carries on after the last stored row shown (or
+        # from the top if buffered events filled the whole page)
+        shown = [r for r in page if r['id'] is not None]
+        if shown and len(shown) < len(rows):
+            nxt = encode_cursor(shown[-1]['timestamp'], shown[-1]['id'])
+        elif not shown and rows:
+            nxt = encode_cursor(rows[0]['timestamp'], rows[0]['id'] + 1)
+        return page, nxt
+
+    @memo_read
     def get_user_badges(self, uid):
         with self._get_db() as conn:
             with conn.cursor(dictionary=True) as cur:
@@ -166,6 +223,7 @@ class AuthManager:
     def get_available_badges(self):
         return BADGE_CONFIG
 
+    @memo_read
     def get_user_info(self, uid):
         with self._get_db() as conn:
             with conn.cursor(dictionary=True) as cur:
@@ -173,13 +231,19 @@ class AuthManager:
                 cur.execute("SELECT username, email, joined_at as created_at, streak as study_streak FROM users WHERE uid = %s", (uid,))
                 return cur.fetchone()
 
-    def get_user_todos(self, uid):
+    @memo_read
+    def get_user_todos(self, uid, after=None, limit=None):
+        # one page, newest first: (rows, next cursor); idx_listing (uid, created_at, tid)
+        limit = page_size(limit)
+        where, args = ["uid = %s"], [uid]
+        tail = seek(where, args, 'created_at', 'tid', after, limit)
         with self._get_db() as conn:
             with conn.cursor(dictionary=True) as cur:
                 # Map columns: task -> task_description, is_done -> completed
-                cur.execute("SELECT tid as id, task as task_description, is_done as completed, created_at FROM todo_tasks WHERE uid = %s ORDER BY created_at DESC", (uid,))
-                return cur.fetchall()
+                cur.execute(f"SELECT tid as id, task as task_description, is_done as completed, created_at FROM todo_tasks WHERE {' AND '.join(where)} {tail}", args)
+                return split_page(cur.fetchall(), limit, 'created_at', 'id')
 
+    @invalidates
     def add_todo(self, uid, task):
         try:
             with self._get_db() as conn:
@@ -193,6 +257,7 @@ class AuthManager:
         except Exception:
             return {'success': False}
 
+    @invalidates
     def toggle_todo(self, task_id, uid):
         try:
             with self._get_db() as conn:
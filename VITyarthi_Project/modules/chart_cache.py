@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# bump this whenever colours / sizes / fonts of the charts change,
+# otherwise old PNGs keep being served as "fresh"
+STYLE_VERSION = 2
+
+
+class ChartCache:
+    # Keeps track of the chart PNGs on disk (CHARTS_DIR).
+    # Every PNG gets a small sidecar file (<name>.png.digest) holding the
+    # digest of the data it was drawn from, so we can skip matplotlib
+    # completely when the data did not change (also across restarts).
+    def __init__(self, folder, max_bytes=50 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._files = OrderedDict()   # path -> size, oldest first
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.isdir(self.folder):
+            return
+        found = []
+        for name in os.listdir(self.folder):
+            if not name.endswith('.png'):
+                continue
+            p = os.path.join(self.folder, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            found.append((st.st_mtime, p, st.st_size))
+
+        # least recently used first
+        for _, p, size in sorted(found):
+            self._files[p] = size
+            self._total += size
+
+    def digest(self, chart_type, *data):
+        # default=str takes care of Decimal / date values coming from MySQL
+        raw = json.dumps([STYLE_VERSION, chart_type, data], default=str, sort_keys=True)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _sidecar(self, path):
+        return path + '.digest'
+
+    def current(self, path):
+        # digest of the PNG currently on disk (None if there isn't one)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(self._sidecar(path)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def is_fresh(self, path, key):
+        try:
+            with open(self._sidecar(path)) as f:
+                same = f.read().strip() == key
+        except OSError:
+            same = False
+
+        if same and os.path.exists(path):
+            with self._lock:
+                self.hits += 1
+                if path in self._files:
+                    self._files.move_to_end(path)
+            try:
+                os.utime(path)   # keeps LRU order right after a restart
+            except OSError:
+                pass
+            return True
+
+        with self._lock:
+            self.misses += 1
+        return False
+
+    def store(self, path, key):
+        with open(self._sidecar(path), 'w') as f:
+            f.write(key)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total -= self._files.pop(path, 0)
+            self._files[path] = size
+            self._total += size
+            victims = self._evict(keep=path)
+
+        for p in victims:
+            for f in (p, self._sidecar(p)):
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+
+    def _evict(self, keep):
+        # caller holds the lock
+        victims = []
+        while self._total > self.max_bytes and len(self._files) > 1:
+            p, size = next(iter(self._files.items()))
+            if p == keep:
+                break
+            self._files.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            victims.append(p)
+        return victims
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
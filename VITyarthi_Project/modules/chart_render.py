@@ -0,0 +1,210 @@
+import os
+import threading
+import matplotlib
+matplotlib.use('Agg') # fix for server side errors
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Chart drawing. Kept apart from charts.py (queries) so that matplotlib
+# is only imported by processes that actually draw: render workers, or the
+# request thread when charts are drawn in-line (see charts.draw_chart).
+#
+# No pyplot in here: pyplot keeps one global "current figure", so two
+# threads drawing at once end up scribbling into each other's chart.
+# Each thread gets its own Figure/Agg canvas per chart type instead. Axes,
+# titles and labels are built once, a render only swaps the data artists.
+# Module level (not methods) so it can also run in a worker process.
+
+STYLE = 'seaborn-v0_8-darkgrid'
+_style_lock = threading.Lock()
+_style_done = False
+_local = threading.local()
+
+def apply_style():
+    # rcParams are global, so set them once and then only ever read them
+    global _style_done
+    with _style_lock:
+        if not _style_done:
+            matplotlib.style.use(STYLE)
+            _style_done = True
+
+def warm_up():
+    # Optional, for the master process before it forks workers (gunicorn
+    # --preload): pays for the matplotlib import, the style and the font
+    # cache / text layout once so no worker does it on its first chart.
+    apply_style()
+    fig = Figure(figsize=(2, 2))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_title('warm up', fontweight='bold')
+    ax.bar(['a'], [1])
+    fig.canvas.draw()
+
+def _cycle_colors(n):
+    cols = matplotlib.rcParams['axes.prop_cycle'].by_key().get('color', ['#4ecdc4'])
+    return [cols[i % len(cols)] for i in range(n)]
+
+
+class _ChartTemplate:
+    figsize = (10, 6)
+
+    def __init__(self):
+        self.fig = Figure(figsize=self.figsize)
+        FigureCanvasAgg(self.fig)
+        self._artists = []
+        self.setup()
+
+    def setup(self):
+        raise NotImplementedError
+
+    def draw(self, d):
+        raise NotImplementedError
+
+    def _keep(self, *artists):
+        self._artists.extend(artists)
+
+    def clear(self):
+        for a in self._artists:
+            a.remove()
+        self._artists = []
+
+    def render(self, d, path):
+        self.clear()
+        self.draw(d)
+        self.fig.savefig(path, format='png', bbox_inches='tight')
+
+
+class _GoalCompletion(_ChartTemplate):
+    figsize = (8, 6)
+    colors = ['#ff6b6b', '#4ecdc4', '#95e1d3']
+
+    def setup(self):
+        self.ax = self.fig.add_subplot()
+        self.ax.set_title('Goal Status', fontweight='bold')
+
+    def draw(self, d):
+        # pie chart
+        wedges, texts, autotexts = self.ax.pie(d['sizes'], labels=d['labels'], autopct='%1.1f%%',
+                                               colors=self.colors, startangle=90)
+        self._keep(*wedges, *texts, *autotexts)
+
+
+class _WeeklyProgress(_ChartTemplate):
+    def setup(self):
+        self.ax = self.fig.add_subplot()
+        self.ax.set_title('Weekly Trends')
+        self.ax.set_ylabel('Total Marks')
+        self.ax.grid(True, alpha=0.3)
+
+    def draw(self, d):
+        # plain positions + tick labels, string x values would keep
+        # piling up categories on a reused axis
+        dates, vals = d['dates'], d['vals']
+        x = list(range(len(dates)))
+        line, = self.ax.plot(x, vals, marker='o', color='#4ecdc4', linewidth=2)
+        fill = self.ax.fill_between(x, vals, alpha=0.3, color='#4ecdc4')
+        self._keep(line, fill)
+
+        self.ax.set_xticks(x)
+        self.ax.set_xticklabels(dates)
+        self.ax.set_xlim(-0.25, max(len(x) - 1, 0) + 0.25)
+        self.ax.set_ylim(0, (max(vals) if vals and max(vals) > 0 else 1) * 1.1)
+
+
+class _SubjectPerformance(_ChartTemplate):
+    def setup(self):
+        self.ax = self.fig.add_subplot()
+        self.ax.set_title('Subject Performance')
+
+    def draw(self, d):
+        y = list(range(len(d['names'])))
+        bars = self.ax.barh(y, d['avgs'], color='#95e1d3')
+        labels = self.ax.bar_label(bars, fmt='%.1f', padding=3)
+        self._keep(*bars, *labels)
+
+        self.ax.set_yticks(y)
+        self.ax.set_yticklabels(d['names'])
+        self.ax.set_ylim(-0.6, len(y) - 0.4)
+        self.ax.set_xlim(0, (max(d['avgs']) or 1) * 1.1)
+
+
+class _MonthlyComparison(_ChartTemplate):
+    def setup(self):
+        # dual axis plot
+        self.ax1 = self.fig.add_subplot()
+        self.c1 = '#4ecdc4'
+        self.ax1.set_ylabel('Count', color=self.c1, fontweight='bold')
+
+        self.ax2 = self.ax1.twinx()
+        self.c2 = '#ff6b6b'
+        self.ax2.set_ylabel('Avg Score', color=self.c2, fontweight='bold')
+
+        self.ax1.set_title('Monthly Overview')
+        self.fig.tight_layout()
+
+    def draw(self, d):
+        x = list(range(len(d['months'])))
+        bars = self.ax1.bar(x, d['counts'], color=self.c1, alpha=0.6, label='Logs')
+        line, = self.ax2.plot(x, d['scores'], color=self.c2, marker='o', label='Avg')
+        self._keep(*bars, line)
+
+        self.ax1.set_xticks(x)
+        self.ax1.set_xticklabels(d['months'])
+        self.ax1.set_xlim(-0.6, len(x) - 0.4)
+        self.ax1.set_ylim(0, (max(d['counts']) or 1) * 1.1)
+        self.ax2.relim()
+        self.ax2.autoscale_view()
+
+
+class _StudyTime(_ChartTemplate):
+    figsize = (8, 6)
+
+    def setup(self):
+        self.ax = self.fig.add_subplot()
+        self.ax.set_title('Study Hours')
+
+    def draw(self, d):
+        # explicit colours, otherwise every render moves the colour cycle on
+        wedges, texts, autotexts = self.ax.pie(d['hours'], labels=d['labels'], autopct='%1.1f%%',
+                                               colors=_cycle_colors(len(d['hours'])), startangle=90)
+        self._keep(*wedges, *texts, *autotexts)
+
+
+_TEMPLATES = {
+    'goal_completion': _GoalCompletion,
+    'weekly_progress': _WeeklyProgress,
+    'subject_performance': _SubjectPerformance,
+    'monthly_comparison': _MonthlyComparison,
+    'study_time': _StudyTime
+}
+
+def _template(chart_type):
+    # one set of templates per thread, never shared
+    cache = getattr(_local, 'templates', None)
+    if cache is None:
+        cache = _local.templates = {}
+    if chart_type not in cache:
+        apply_style()
+        cache[chart_type] = _TEMPLATES[chart_type]()
+    return cache[chart_type]
+
+def render_chart(chart_type, data, path):
+    tpl = _template(chart_type)
+
+    # write next to the target and swap in, so whoever is serving the
+    # old PNG never sees a half written file
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        tpl.render(data, tmp)
+    except Exception:
+        # don't keep a template around in a half drawn state
+        _local.templates.pop(chart_type, None)
+        # nor a partly written temp file, the cache only evicts real charts
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+    os.replace(tmp, path)
+    return path
@@ -1,34 +1,88 @@
 import os
-import mysql.connector
-import matplotlib
-matplotlib.use('Agg') # fix for server side errors
-import matplotlib.pyplot as plt
+import time
 from datetime import datetime, timedelta
+from modules.chart_cache import ChartCache
+from modules.request_memo import memo_read
+from modules.metrics import record_chart
+
+CHART_TYPES = (
+    'goal_completion',
+    'weekly_progress',
+    'subject_performance',
+    'monthly_comparison',
+    'study_time'
+)
 
 class ChartGenerator:
-    def __init__(self, db_config, folder):
-        self.conf = db_config
+    def __init__(self, pool, folder, cache_max_bytes=50 * 1024 * 1024):
+        self.pool = pool
         self.folder = folder
-        
+
         # make sure path exists
         if not os.path.exists(folder):
             os.makedirs(folder)
-            
-        plt.style.use('seaborn-v0_8-darkgrid')
+
+        # skips re-rendering when the data behind a chart hasn't changed
+        self.cache = ChartCache(folder, max_bytes=cache_max_bytes)
+
+    def chart_path(self, chart_type, uid):
+        return os.path.join(self.folder, f'{chart_type}_{uid}.png')
+
+    @memo_read
+    def fetch(self, chart_type, uid):
+        # just the DB half, returns plain lists ready for draw_chart()
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f'Unknown chart: {chart_type}')
+        return getattr(self, f'_{chart_type}_data')(uid)
+
+    def render(self, chart_type, uid, renderer=None):
+        # renderer lets the render service push the matplotlib part
+        # into another process; default is to draw right here
+        data = self.fetch(chart_type, uid)
+        if data is None:
+            return None
+
+        path = self.chart_path(chart_type, uid)
+        key = self.cache.digest(chart_type, data)
+        if self.cache.is_fresh(path, key):
+            return path
+
+        start = time.perf_counter()
+        (renderer or draw_chart)(chart_type, data, path)
+        record_chart(chart_type, time.perf_counter() - start)
+        self.cache.store(path, key)
+        return path
 
     def generate_goal_completion_chart(self, user_id):
+        return self.render('goal_completion', user_id)
+
+    def generate_weekly_progress_chart(self, uid):
+        return self.render('weekly_progress', uid)
+
+    def generate_subject_performance_chart(self, uid):
+        return self.render('subject_performance', uid)
+
+    def generate_monthly_comparison_chart(self, user_id):
+        return self.render('monthly_comparison', user_id)
+
+    def generate_study_time_chart(self, uid):
+        return self.render('study_time', uid)
+
+    # --- queries ---
+
+    def _goal_completion_data(self, user_id):
         # Using default cursor (tuples) here
-        conn = mysql.connector.connect(**self.conf)
+        conn = self.pool.connect()
         cur = conn.cursor()
-        
+
         try:
             # UPDATED: user_id -> uid
             cur.execute("SELECT status, COUNT(*) FROM goals WHERE uid = %s GROUP BY status", (user_id,))
             rows = cur.fetchall()
         finally:
-            conn.close() 
+            conn.close()
 
-        if not rows: 
+        if not rows:
             return None
 
         # manual unpacking
@@ -38,25 +92,13 @@ class ChartGenerator:
             labels.append(r[0])
             sizes.append(r[1])
 
-        # pie chart
-        plt.figure(figsize=(8, 6))
-        colors = ['#ff6b6b', '#4ecdc4', '#95e1d3'] 
-        plt.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors, startangle=90)
-        plt.title('Goal Status', fontweight='bold')
-        
-        # save it
-        fname = f'goal_completion_{user_id}.png'
-        path = os.path.join(self.folder, fname)
-        plt.savefig(path, bbox_inches='tight')
-        plt.close()
-        
-        return path
+        return {'labels': labels, 'sizes': sizes}
 
-    def generate_weekly_progress_chart(self, uid):
+    def _weekly_progress_data(self, uid):
         # get last 7 days
-        with mysql.connector.connect(**self.conf) as conn:
+        with self.pool.connect() as conn:
             with conn.cursor(dictionary=True) as cur:
-                # UPDATED: 
+                # UPDATED:
                 # - date_logged -> logged_at
                 # - marks_scored -> marks
                 # - subject_id -> sid
@@ -65,7 +107,7 @@ class ChartGenerator:
                     SELECT DATE(logged_at) as dt, SUM(marks) as val
                     FROM progress_logs pl
                     JOIN subjects s ON pl.sid = s.sid
-                    WHERE s.uid = %s 
+                    WHERE s.uid = %s
                     AND logged_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
                     GROUP BY dt ORDER BY dt ASC
                 """
@@ -79,27 +121,16 @@ class ChartGenerator:
             vals = [0] * 7
         else:
             dates = [x['dt'].strftime('%m/%d') for x in data]
-            vals = [x['val'] for x in data]
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(dates, vals, marker='o', color='#4ecdc4', linewidth=2)
-        plt.fill_between(range(len(dates)), vals, alpha=0.3, color='#4ecdc4')
-        
-        plt.title('Weekly Trends')
-        plt.ylabel('Total Marks')
-        plt.grid(True, alpha=0.3)
-        
-        f_path = os.path.join(self.folder, f'weekly_progress_{uid}.png')
-        plt.savefig(f_path, bbox_inches='tight')
-        plt.close()
-        return f_path
+            vals = [float(x['val']) for x in data]
 
-    def generate_subject_performance_chart(self, uid):
+        return {'dates': dates, 'vals': vals}
+
+    def _subject_performance_data(self, uid):
         # top 10 subjs
-        conn = mysql.connector.connect(**self.conf)
+        conn = self.pool.connect()
         cur = conn.cursor() # tuples again
-        
-        # UPDATED: 
+
+        # UPDATED:
         # - subject_name -> name
         # - marks_scored -> marks
         # - subject_id -> sid
@@ -121,34 +152,24 @@ class ChartGenerator:
 
         names = [x[0][:15] for x in res]
         avgs = [float(x[1]) for x in res]
+        return {'names': names, 'avgs': avgs}
 
-        fig, ax = plt.subplots(figsize=(10, 6))
-        bars = ax.barh(names, avgs, color='#95e1d3')
-        
-        ax.bar_label(bars, fmt='%.1f', padding=3)
-        ax.set_title('Subject Performance')
-        
-        out = os.path.join(self.folder, f'subject_performance_{uid}.png')
-        plt.savefig(out, bbox_inches='tight')
-        plt.close()
-        return out
-
-    def generate_monthly_comparison_chart(self, user_id):
+    def _monthly_comparison_data(self, user_id):
         # UPDATED:
         # - date_logged -> logged_at
         # - marks_scored -> marks
         # - subject_id -> sid
         # - user_id -> uid
         sql = """
-            SELECT DATE_FORMAT(logged_at, '%Y-%m') as m, 
+            SELECT DATE_FORMAT(logged_at, '%Y-%m') as m,
                    COUNT(*) as cnt, AVG(marks) as score
             FROM progress_logs pl
             JOIN subjects s ON pl.sid = s.sid
             WHERE s.uid = %s AND logged_at >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
             GROUP BY m ORDER BY m ASC
         """
-        
-        conn = mysql.connector.connect(**self.conf)
+
+        conn = self.pool.connect()
         cur = conn.cursor(dictionary=True)
         cur.execute(sql, (user_id,))
         rows = cur.fetchall()
@@ -156,43 +177,28 @@ class ChartGenerator:
 
         if not rows: return None
 
-        months = [r['m'] for r in rows]
-        
-        # dual axis plot
-        fig, ax1 = plt.subplots(figsize=(10, 6))
-        
-        c1 = '#4ecdc4'
-        ax1.bar(months, [r['cnt'] for r in rows], color=c1, alpha=0.6, label='Logs')
-        ax1.set_ylabel('Count', color=c1, fontweight='bold')
-        
-        ax2 = ax1.twinx()
-        c2 = '#ff6b6b'
-        ax2.plot(months, [r['score'] for r in rows], color=c2, marker='o', label='Avg')
-        ax2.set_ylabel('Avg Score', color=c2, fontweight='bold')
-        
-        plt.title('Monthly Overview')
-        fig.tight_layout()
-        
-        path = os.path.join(self.folder, f'monthly_comparison_{user_id}.png')
-        plt.savefig(path, bbox_inches='tight')
-        plt.close()
-        return path
+        return {
+            'months': [r['m'] for r in rows],
+            'counts': [r['cnt'] for r in rows],
+            'scores': [float(r['score']) for r in rows]
+        }
 
-    def generate_study_time_chart(self, uid):
+    def _study_time_data(self, uid):
         # UPDATED:
         # - subject_name -> name
         # - duration_minutes -> duration_mins
         # - subject_id -> sid
         # - user_id -> uid
         # - id -> sid
-        with mysql.connector.connect(**self.conf) as conn:
+        # per subject totals come pre-summed from study_totals
+        with self.pool.connect() as conn:
             cur = conn.cursor()
             cur.execute("""
-                SELECT s.name, SUM(ss.duration_mins)
-                FROM study_sessions ss
-                JOIN subjects s ON ss.sid = s.sid
-                WHERE ss.uid = %s
-                GROUP BY s.sid ORDER BY 2 DESC LIMIT 10
+                SELECT s.name, t.total_mins
+                FROM study_totals t
+                JOIN subjects s ON t.sid = s.sid
+                WHERE t.uid = %s AND t.sid <> 0
+                ORDER BY 2 DESC LIMIT 10
             """, (uid,))
             data = cur.fetchall()
 
@@ -203,14 +209,13 @@ class ChartGenerator:
         lbls = []
         for row in data:
             lbls.append(row[0])
-            hrs.append(round(row[1]/60, 1))
-
-        plt.figure(figsize=(8, 6))
-        plt.pie(hrs, labels=lbls, autopct='%1.1f%%', startangle=90)
-        plt.title('Study Hours')
-        
-        p = os.path.join(self.folder, f'study_time_{uid}.png')
-        plt.savefig(p, bbox_inches='tight')
-        plt.close()
-        
-        return p
\ No newline at end of file
+            hrs.append(round(float(row[1])/60, 1))
+
+        return {'labels': lbls, 'hours': hrs}
+
+
+def draw_chart(chart_type, data, path):
+    # matplotlib (and its font cache) only gets loaded by whoever actually
+    # draws a chart, not by every worker that imports this module
+    from modules.chart_render import render_chart
+    return render_chart(chart_type, data, path)
@@ -0,0 +1,73 @@
+from flask import g, has_request_context
+
+# Per-user data version (users.data_version).
+# Every manager write (anything marked @invalidates) flags the user as
+# changed; once the view is done, before the response goes out, the
+# version is bumped with a single UPDATE per request. Pages use the
+# version in their ETag, so as long as nothing was written a repeat view
+# is answered with 304 without running a single report query.
+
+def mark_dirty(uid):
+    if uid is None or not has_request_context():
+        return
+    dirty = g.get('_dirty_uids')
+    if dirty is None:
+        dirty = g._dirty_uids = set()
+    dirty.add(uid)
+
+
+class DataVersions:
+    def __init__(self, pool):
+        self.pool = pool
+        self._listeners = []
+
+    def subscribe(self, fn):
+        # fn(uids) is called in this worker whenever users wrote something
+        # (in-process caches drop their entries right away)
+        self._listeners.append(fn)
+
+    def get(self, uid):
+        # once per request, it's asked for by every versioned view/url
+        cache = g.get('_data_versions')
+        if cache is None:
+            cache = g._data_versions = {}
+        if uid not in cache:
+            with self.pool.connect() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT data_version FROM users WHERE uid = %s", (uid,))
+                    row = cur.fetchone()
+            cache[uid] = row[0] if row else 0
+        return cache[uid]
+
+    def bump(self, uids):
+        uids = list(uids)
+        if not uids:
+            return
+        with self.pool.connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"UPDATE users SET data_version = data_version + 1 WHERE uid IN ({', '.join(['%s'] * len(uids))})",
+                    uids
+                )
+            conn.commit()
+
+    def bump_all(self):
+        # after maintenance jobs that rewrite derived data for everyone
+        with self.pool.connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("UPDATE users SET data_version = data_version + 1")
+            conn.commit()
+
+    def flush(self, response=None):
+        # after_request: must happen before the client can follow the
+        # redirect, or the next GET could still match the old ETag
+        uids = g.pop('_dirty_uids', None)
+        g.pop('_data_versions', None)
+        if uids:
+            for fn in self._listeners:
+                fn(uids)
+            try:
+                self.bump(uids)
+            except Exception as e:
+                print(f"Data version error: {e}")
+        return response
@@ -0,0 +1,232 @@
+import time
+import queue
+import threading
+import mysql.connector
+from modules.metrics import record_query, record_fetch, record_acquire
+
+
+class PoolTimeout(Exception):
+    # raised when nobody hands a connection back in time
+    pass
+
+
+class TimedCursor:
+    # cursor proxy that reports query / fetch time to modules.metrics
+    # (unbuffered cursors do most of their work in fetch*) and, when the
+    # pool has one, to the slow query log
+    def __init__(self, raw, slow_log=None):
+        self._raw = raw
+        self._slow_log = slow_log
+        self._stmt = None   # [sql, params, seconds so far, many, logged]
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _check_slow(self):
+        st = self._stmt
+        if self._slow_log is not None and st is not None and not st[4]:
+            st[4] = self._slow_log.check(st[0], st[1], st[2], many=st[3])
+
+    def _run(self, name, sql, params, many):
+        start = time.perf_counter()
+        try:
+            return getattr(self._raw, name)(sql, params)
+        finally:
+            took = time.perf_counter() - start
+            record_query(took)
+            self._stmt = [sql, params, took, many, False]
+            self._check_slow()
+
+    def execute(self, sql, params=()):
+        return self._run('execute', sql, params, False)
+
+    def executemany(self, sql, seq_params):
+        return self._run('executemany', sql, seq_params, True)
+
+    def _timed_fetch(self, name, *args):
+        start = time.perf_counter()
+        try:
+            return getattr(self._raw, name)(*args)
+        finally:
+            took = time.perf_counter() - start
+            record_fetch(took)
+            if self._stmt is not None:
+                self._stmt[2] += took
+                self._check_slow()
+
+    def fetchone(self):
+        return self._timed_fetch('fetchone')
+
+    def fetchmany(self, *args):
+        return self._timed_fetch('fetchmany', *args)
+
+    def fetchall(self):
+        return self._timed_fetch('fetchall')
+
+
+class PooledConnection:
+    # Thin wrapper around a real connection.
+    # close() / leaving a `with` block gives it back to the pool
+    # instead of tearing down the socket.
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._raw.cursor(*args, **kwargs), self._pool.slow_log)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw)
+
+    def __del__(self):
+        # some code paths forget close() when a query throws,
+        # don't lose the slot forever because of that
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, db_conf, size=10, timeout=10, health_check=True):
+        self.conf = db_conf
+        self.size = size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.slow_log = None   # optional SlowQueryLog, see slow_query.py
+
+        # LIFO so the hottest connection gets reused first
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,            # checkouts that had to block
+            'wait_total_ms': 0.0,
+            'wait_max_ms': 0.0,
+            'created': 0,
+            'replaced': 0,         # dead connections swapped out
+            'timeouts': 0
+        }
+
+    def _new_raw(self):
+        raw = mysql.connector.connect(**self.conf)
+        with self._lock:
+            self._stats['created'] += 1
+        return raw
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait(), False
+        except queue.Empty:
+            pass
+
+        # room to grow?
+        with self._lock:
+            grow = self._created < self.size
+            if grow:
+                self._created += 1
+
+        if grow:
+            try:
+                return self._new_raw(), False
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # pool is full, wait for someone to give one back
+        try:
+            return self._idle.get(timeout=self.timeout), True
+        except queue.Empty:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(f"No DB connection free after {self.timeout}s (size={self.size})")
+
+    def connect(self):
+        start = time.perf_counter()
+        raw, waited = self._checkout()
+
+        # ping before handing it out, reconnect if the server dropped us
+        if self.health_check and not raw.is_connected():
+            self._discard(raw)
+            with self._lock:
+                self._created += 1
+                self._stats['replaced'] += 1
+            try:
+                raw = self._new_raw()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        record_acquire(time.perf_counter() - start)
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            s = self._stats
+            s['checkouts'] += 1
+            if waited:
+                s['waits'] += 1
+            s['wait_total_ms'] += elapsed
+            if elapsed > s['wait_max_ms']:
+                s['wait_max_ms'] = elapsed
+
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        # don't leak half-read results or an open transaction to the next borrower
+        try:
+            if raw.unread_result:
+                raw.consume_results()
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        self._idle.put(raw)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s['size'] = self.size
+            s['open'] = self._created
+        s['idle'] = self._idle.qsize()
+        s['wait_avg_ms'] = round(s['wait_total_ms'] / s['checkouts'], 3) if s['checkouts'] else 0
+        return s
+
+    def close_all(self):
+        while True:
+            try:
+                raw = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(raw)
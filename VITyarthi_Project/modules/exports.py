@@ -1,123 +1,391 @@
 import csv
-import os
+import io
+import json
+import queue
 import zipfile
-import mysql.connector
+import tempfile
+import threading
 from datetime import datetime
 
+_DONE = object()
+
+SPOOL_MEMORY = 1024 * 1024   # bytes a waiting ZIP entry keeps in memory before going to disk
+
+
+class _ZipSink:
+    # write-only "file" for ZipFile: no seek/tell, so zipfile switches to
+    # streaming mode (data descriptors) and we just hand the bytes on
+    def __init__(self):
+        self._parts = []
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        out = b''.join(self._parts)
+        self._parts = []
+        return out
+
+
+class _Spool:
+    # Where a dataset's producer puts its CSV chunks during a ZIP export.
+    # Until the ZIP writer gets to this dataset they go into a temp file, so
+    # the query runs to the end and its connection goes back to the pool
+    # instead of waiting for the entries before it; once the writer is on
+    # it (live) they're handed over through a small bounded queue, and a
+    # slow client throttles the query as before.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        self.end = None       # _DONE or the error, if it finished while spooling
+        self.live = False
+        self.closed = False
+        self.q = queue.Queue(maxsize=64)
+
+    def take(self):
+        # switch to live: returns what was spooled so far and how it ended (if it did)
+        with self.lock:
+            self.live = True
+            self.file.seek(0)
+            return self.file, self.end
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.file.close()
+
+
 class DataExporter:
-    def __init__(self, cfg):
-        self.cfg = cfg
-        # check folder
-        if not os.path.exists('static/exports'):
-            os.makedirs('static/exports')
+    def __init__(self, pool):
+        self.pool = pool
 
     def _get_conn(self):
-        return mysql.connector.connect(**self.cfg)
-
-    def export_goals_csv(self, uid):
-        # Manual CSV writing (string manipulation) instead of csv lib
-        # This breaks the pattern completely
-        tstamp = datetime.now().strftime("%Y%m%d")
-        fname = f'static/exports/goals_{uid}_{tstamp}.csv'
-        
+        return self.pool.connect()
+
+    # --- streaming versions ---
+    # These yield CSV text chunk by chunk straight off an unbuffered cursor,
+    # so memory stays flat however many rows there are and nothing touches
+    # the disk. The connection is held until the generator finishes (or is
+    # closed because the client went away).
+
+    def _stream_csv(self, sql, args, header, fmt_row, chunk_rows=500, counts=None):
+        buf = io.StringIO()
+        w = csv.writer(buf)
+
         conn = self._get_conn()
         try:
-            cur = conn.cursor()
-            # using aliases to match old schema if needed
-            q = "SELECT subject, target_score, progress, status, due_date FROM goals WHERE uid = %s"
-            cur.execute(q, (uid,))
-            data = cur.fetchall()
-            
-            with open(fname, 'w') as f:
-                # write header
-                f.write("Subject,Target,Progress,Status,Deadline\n")
-                for row in data:
-                    # manual string formatting
-                    line = f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]}\n"
-                    f.write(line)
-            return fname
-            
-        except Exception as e:
-            print(f"Export error: {e}")
-            return None
+            cur = conn.cursor()   # unbuffered by default in mysql.connector
+            cur.execute(sql, args)
+
+            w.writerow(header)
+            yield buf.getvalue()
+
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                if counts is not None:
+                    counts['rows'] = counts.get('rows', 0) + len(rows)
+                buf.seek(0)
+                buf.truncate()
+                w.writerows(fmt_row(r) for r in rows)
+                yield buf.getvalue()
+            cur.close()
         finally:
             conn.close()
 
-    def export_progress_csv(self, uid):
-        # Standard CSV lib usage here
-        f_path = os.path.join('static/exports', f'progress_{uid}.csv')
-        
-        with self._get_conn() as conn:
-            with conn.cursor() as cur:
-                # join query
-                sql = """
-                    SELECT s.name, p.marks, p.logged_at, p.notes
-                    FROM progress_logs p
-                    JOIN subjects s ON p.sid = s.sid
-                    WHERE s.uid = %s
-                    ORDER BY p.logged_at DESC
-                """
-                cur.execute(sql, (uid,))
-                rows = cur.fetchall()
-
-        # writing file outside db context
-        with open(f_path, 'w', newline='') as csvfile:
-            w = csv.writer(csvfile)
-            w.writerow(['Subject', 'Marks', 'Date', 'Notes'])
-            for r in rows:
-                d = r[2].strftime('%Y-%m-%d')
-                w.writerow([r[0], r[1], d, r[3]])
-                
-        return f_path
-
-    def export_reports_csv(self, uid):
-        # DictWriter approach for variation
-        out = f'static/exports/summary_{uid}.csv'
-        
-        conn = self._get_conn()
-        cur = conn.cursor(dictionary=True)
-        
-        cur.execute("""
+    def stream_goals_csv(self, uid):
+        q = "SELECT subject, target_score, progress, status, due_date FROM goals WHERE uid = %s"
+        return self._stream_csv(q, (uid,), ['Subject', 'Target', 'Progress', 'Status', 'Deadline'], list)
+
+    def stream_progress_csv(self, uid):
+        sql = """
+            SELECT s.name, p.marks, p.logged_at, p.notes
+            FROM progress_logs p
+            JOIN subjects s ON p.sid = s.sid
+            WHERE s.uid = %s
+            ORDER BY p.logged_at DESC
+        """
+        fmt = lambda r: [r[0], r[1], r[2].strftime('%Y-%m-%d'), r[3]]
+        return self._stream_csv(sql, (uid,), ['Subject', 'Marks', 'Date', 'Notes'], fmt)
+
+    def stream_reports_csv(self, uid):
+        sql = """
             SELECT s.name, AVG(p.marks) as avg, COUNT(p.log_id) as cnt
             FROM subjects s
             LEFT JOIN progress_logs p ON s.sid = p.sid
             WHERE s.uid = %s GROUP BY s.sid
-        """, (uid,))
-        
-        res = cur.fetchall()
-        conn.close()
-
-        with open(out, 'w', newline='') as f:
-            # simpler header
-            f.write("Subject,Avg Marks,Log Count\n")
-            for r in res:
-                # handling nulls inline
-                a = round(r['avg'], 2) if r['avg'] else 0
-                f.write(f"{r['name']},{a},{r['cnt']}\n")
-                
-        return out
+        """
+        # handling nulls inline
+        fmt = lambda r: [r[0], round(r[1], 2) if r[1] else 0, r[2]]
+        return self._stream_csv(sql, (uid,), ['Subject', 'Avg Marks', 'Log Count'], fmt)
+
+    # --- everything as one ZIP ---
+
+    def _produce(self, name, gen, spool, ready, stop):
+        # runs in its own thread with its own pooled connection; the first
+        # item it hands over (rows, _DONE or an error) also puts its name on
+        # `ready`, which is what the ZIP writer waits on
+        first = True
+        try:
+            for chunk in gen:
+                if not self._put(spool, chunk, stop):
+                    return
+                if first:
+                    ready.put(name)
+                    first = False
+            self._put(spool, _DONE, stop)
+        except Exception as e:
+            self._put(spool, e, stop)
+        finally:
+            if first:
+                ready.put(name)
+            gen.close()
+
+    def _put(self, spool, item, stop):
+        with spool.lock:
+            if spool.closed:
+                return False
+            if not spool.live:
+                if isinstance(item, str):
+                    spool.file.write(item.encode('utf-8'))
+                else:
+                    spool.end = item
+                return True
+        # live: bounded queue so a slow client throttles the query instead
+        # of piling rows up in memory
+        while not stop.is_set():
+            try:
+                spool.q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def stream_all_zip(self, uid):
+        return self._stream_zip({
+            'goals.csv': self.stream_goals_csv(uid),
+            'progress.csv': self.stream_progress_csv(uid),
+            'summary.csv': self.stream_reports_csv(uid)
+        })
+
+    def _stream_zip(self, datasets, finish=None):
+        # The datasets are queried at the same time on separate
+        # connections. Whichever has rows ready first gets written into its
+        # ZIP entry and sent on while the others keep fetching into their
+        # spools (see _Spool), so the client starts receiving bytes before
+        # the slowest query is done and only the entry being sent holds a
+        # connection for as long as the client takes.
+        # finish() runs once every dataset made it into the archive and can
+        # return extra {name: bytes} entries to append (e.g. a manifest).
+        stop = threading.Event()
+        spools = {name: _Spool() for name in datasets}
+        ready = queue.Queue()   # dataset names, in the order they first have data
+        for name, gen in datasets.items():
+            threading.Thread(target=self._produce, args=(name, gen, spools[name], ready, stop),
+                             name=f'export-{name}', daemon=True).start()
+
+        sink = _ZipSink()
+        try:
+            with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                for _ in datasets:
+                    name = ready.get()
 
-    def export_all_data(self, uid):
-        # Zip everything
-        z_path = f'static/exports/student_data_{uid}.zip'
-        
-        # get files
-        files = []
-        f1 = self.export_goals_csv(uid)
-        if f1: files.append(f1)
-        
-        f2 = self.export_progress_csv(uid)
-        if f2: files.append(f2)
-        
-        f3 = self.export_reports_csv(uid)
-        if f3: files.append(f3)
-        
-        if not files: return None
-        
+                    spooled, end = spools[name].take()
+                    with zf.open(name, 'w') as entry:
+                        for block in iter(lambda: spooled.read(64 * 1024), b''):
+                            entry.write(block)
+                            out = sink.drain()
+                            if out:
+                                yield out
+                        while end is None:
+                            item = spools[name].q.get()
+                            if item is _DONE or isinstance(item, Exception):
+                                end = item
+                                continue
+                            entry.write(item.encode('utf-8'))
+                            out = sink.drain()
+                            if out:
+                                yield out
+                        if isinstance(end, Exception):
+                            raise end
+                    spools[name].close()
+                    yield sink.drain()
+
+                for name, data in (finish() if finish else {}).items():
+                    zf.writestr(name, data)
+            yield sink.drain()   # central directory
+        finally:
+            stop.set()
+            for spool in spools.values():
+                spool.close()
+
+
+    # --- delta exports ---
+    # For students who sync into their own spreadsheet: only rows added or
+    # changed since their last delta export of that dataset. The position
+    # reached is kept per user and dataset in export_watermarks and is only
+    # moved forward once the whole file has been sent, so a broken download
+    # is simply repeated next time. Passing since= overrides the stored
+    # watermark (a client that keeps its own position, or since=0 to start
+    # over).
+    #
+    # goals:    changed rows, window on updated_at [from, to). Goals get
+    #           edited, so merge by goal_id (upsert). Deletes aren't tracked.
+    # progress: append-only, window on log_id (from, to]. Just append.
+    # The subject summary is an aggregate and is always exported in full.
+
+    DELTA_DATASETS = ('goals', 'progress')
+
+    def get_watermark(self, uid, dataset):
+        conn = self._get_conn()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT last_id, last_ts, exported_at, row_count FROM export_watermarks WHERE uid = %s AND dataset = %s",
+                        (uid, dataset))
+            row = cur.fetchone()
+            cur.close()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {'last_id': row[0], 'last_ts': row[1], 'exported_at': row[2], 'rows': row[3]}
+
+    def _save_watermark(self, uid, dataset, window, rows):
+        conn = self._get_conn()
         try:
-            with zipfile.ZipFile(z_path, 'w') as z:
-                for f in files:
-                    z.write(f, os.path.basename(f))
-            return z_path
-        except:
-            return None
\ No newline at end of file
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO export_watermarks (uid, dataset, last_id, last_ts, exported_at, row_count)
+                VALUES (%s, %s, %s, %s, NOW(), %s)
+                ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), last_ts = VALUES(last_ts),
+                    exported_at = VALUES(exported_at), row_count = VALUES(row_count)
+            """, (uid, dataset, window['to_id'], window['to_ts'], rows))
+            conn.commit()
+            cur.close()
+        finally:
+            conn.close()
+
+    def _parse_since(self, dataset, since):
+        # since= takes the "until" value from a previous manifest:
+        # an ISO timestamp for goals, a log id for progress; 0 = everything
+        if str(since) in ('', '0'):
+            return None if dataset == 'goals' else 0
+        if dataset == 'goals':
+            return datetime.fromisoformat(str(since))
+        return int(since)
+
+    def _delta_window(self, uid, dataset, since=None):
+        # Fix the upper end before streaming so rows written while the
+        # export runs land in the next delta instead of being half in
+        # this one.
+        if since is not None:
+            start = self._parse_since(dataset, since)
+        else:
+            mark = self.get_watermark(uid, dataset)
+            if dataset == 'goals':
+                start = mark['last_ts'] if mark else None
+            else:
+                start = mark['last_id'] if mark else 0
+
+        conn = self._get_conn()
+        try:
+            cur = conn.cursor()
+            if dataset == 'goals':
+                # rows stamped in the current second are left for next time,
+                # more may still arrive with that same stamp
+                cur.execute("SELECT NOW()")
+                window = {'from_id': None, 'to_id': None, 'from_ts': start, 'to_ts': cur.fetchone()[0]}
+            else:
+                cur.execute("""
+                    SELECT COALESCE(MAX(p.log_id), 0) FROM progress_logs p
+                    JOIN subjects s ON p.sid = s.sid WHERE s.uid = %s
+                """, (uid,))
+                to_id = cur.fetchone()[0]
+                window = {'from_id': min(start, to_id), 'to_id': to_id, 'from_ts': None, 'to_ts': None}
+            cur.close()
+        finally:
+            conn.close()
+        return window
+
+    def _delta_gen(self, uid, dataset, window, counts):
+        if dataset == 'goals':
+            where, args = ["uid = %s", "updated_at < %s"], [uid, window['to_ts']]
+            if window['from_ts']:
+                where.append("updated_at >= %s")
+                args.append(window['from_ts'])
+            sql = f"""
+                SELECT gid, subject, target_score, progress, status, due_date, updated_at
+                FROM goals WHERE {' AND '.join(where)}
+                ORDER BY updated_at, gid
+            """
+            header = ['Goal ID', 'Subject', 'Target', 'Progress', 'Status', 'Deadline', 'Updated']
+            return self._stream_csv(sql, args, header, list, counts=counts)
+
+        sql = """
+            SELECT p.log_id, s.name, p.marks, p.logged_at, p.notes
+            FROM progress_logs p
+            JOIN subjects s ON p.sid = s.sid
+            WHERE s.uid = %s AND p.log_id > %s AND p.log_id <= %s
+            ORDER BY p.log_id
+        """
+        fmt = lambda r: [r[0], r[1], r[2], r[3].strftime('%Y-%m-%d'), r[4]]
+        return self._stream_csv(sql, (uid, window['from_id'], window['to_id']),
+                                ['Log ID', 'Subject', 'Marks', 'Date', 'Notes'], fmt, counts=counts)
+
+    def _manifest_entry(self, dataset, window, rows):
+        if dataset == 'goals':
+            return {
+                'file': 'goals.csv', 'rows': rows, 'merge': 'upsert', 'key': 'Goal ID',
+                'since': window['from_ts'].isoformat() if window['from_ts'] else None,
+                'until': window['to_ts'].isoformat()
+            }
+        return {
+            'file': 'progress.csv', 'rows': rows, 'merge': 'append', 'key': 'Log ID',
+            'since': window['from_id'], 'until': window['to_id']
+        }
+
+    def stream_delta_csv(self, uid, dataset, since=None):
+        # returns (generator, manifest entry without the row count)
+        if dataset not in self.DELTA_DATASETS:
+            raise ValueError(f'No delta export for {dataset}')
+        window = self._delta_window(uid, dataset, since)
+        counts = {}
+
+        def gen():
+            yield from self._delta_gen(uid, dataset, window, counts)
+            # only reached when every row was sent
+            self._save_watermark(uid, dataset, window, counts.get('rows', 0))
+
+        manifest = self._manifest_entry(dataset, window, None)
+        del manifest['rows']
+        return gen(), manifest
+
+    def stream_delta_zip(self, uid, since=None):
+        # goals.csv + progress.csv with just the new rows, summary.csv in
+        # full and a manifest.json describing how to merge each file.
+        # since: optional {dataset: value} overriding the stored watermarks
+        since = since or {}
+        windows = {d: self._delta_window(uid, d, since.get(d)) for d in self.DELTA_DATASETS}
+        counts = {d: {} for d in self.DELTA_DATASETS}
+
+        datasets = {f'{d}.csv': self._delta_gen(uid, d, windows[d], counts[d]) for d in self.DELTA_DATASETS}
+        datasets['summary.csv'] = self.stream_reports_csv(uid)
+
+        def finish():
+            manifest = {
+                'user': uid,
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'datasets': {d: self._manifest_entry(d, windows[d], counts[d].get('rows', 0))
+                             for d in self.DELTA_DATASETS},
+                'full': ['summary.csv']
+            }
+            for d in self.DELTA_DATASETS:
+                self._save_watermark(uid, d, windows[d], counts[d].get('rows', 0))
+            return {'manifest.json': json.dumps(manifest, indent=2)}
+
+        return self._stream_zip(datasets, finish)
@@ -1,13 +1,15 @@
-import mysql.connector
-from datetime import datetime, timedelta
+from modules.request_memo import memo_read, invalidates
+from modules.rollups import bump_daily
+from modules.paging import page_size, seek, split_page
 
 class GoalManager:
-    def __init__(self, config):
-        self.cfg = config
+    def __init__(self, pool):
+        self.pool = pool
 
     def _db(self):
-        return mysql.connector.connect(**self.cfg)
+        return self.pool.connect()
 
+    @invalidates
     def create_goal(self, uid, subject, score, deadline, description=''):
         conn = self._db()
         cur = conn.cursor()
@@ -31,7 +33,10 @@ class GoalManager:
             cur.close()
             conn.close()
 
-    def get_user_goals(self, user_id):
+    @memo_read
+    def get_user_goals(self, user_id, after=None, limit=None):
+        # one page, newest first: (rows, cursor for the next page or None)
+        limit = page_size(limit)
         conn = self._db()
         cur = conn.cursor(dictionary=True)
         
@@ -53,22 +58,24 @@ class GoalManager:
                 description, 
                 created_at 
             FROM goals 
-            WHERE uid = %s
+            WHERE {where}
+            {tail}
         """
+        # walks idx_listing (uid, created_at, gid)
+        where, args = ["uid = %s"], [user_id]
+        tail = seek(where, args, 'created_at', 'gid', after, limit)
         
-        cur.execute(query, (user_id,))
-        rows = cur.fetchall()
+        cur.execute(query.format(where=' AND '.join(where), tail=tail), args)
+        rows, nxt = split_page(cur.fetchall(), limit, 'created_at', 'id')
         conn.close()
-
-        # sort manually in python because why not
-        rows.sort(key=lambda x: x['created_at'], reverse=True)
         
         # quick status sync check
         for r in rows:
             self._sync_status(r)
         
-        return rows
+        return rows, nxt
 
+    @invalidates
     def update_goal_progress(self, goal_id, uid, progress):
         conn = self._db()
         cur = conn.cursor()
@@ -88,6 +95,7 @@ class GoalManager:
             # Update using DB column names (progress, status, gid)
             q = "UPDATE goals SET progress=%s, status=%s WHERE gid=%s"
             cur.execute(q, (p, new_stat, goal_id))
+            bump_daily(cur, uid, goals_updated=1)
             conn.commit()
             
             return {'success': True}
@@ -112,6 +120,7 @@ class GoalManager:
         if s != real_s:
             goal_row['status'] = real_s 
 
+    @invalidates
     def delete_goal(self, gid, uid):
         conn = self._db()
         try:
@@ -130,51 +139,57 @@ class GoalManager:
         finally:
             conn.close()
 
+    @memo_read
     def get_user_stats(self, uid):
-        # Re-using the get_user_goals logic to get the data
-        # then processing in Python (inefficient but safe)
-        goals = self.get_user_goals(uid)
-        
-        total = len(goals)
-        if total == 0:
+        # Aggregated in MySQL, only one row comes back.
+        # Status is derived from progress (same rule as _sync_status)
+        # so a stale status column can't skew the numbers.
+        sql = """
+            SELECT COUNT(*) as total,
+                   SUM(CASE WHEN progress >= 100 THEN 1 ELSE 0 END) as done,
+                   SUM(CASE WHEN progress > 0 AND progress < 100 THEN 1 ELSE 0 END) as active,
+                   AVG(progress) as avg_prog
+            FROM goals
+            WHERE uid = %s
+        """
+        with self._db() as conn:
+            with conn.cursor(dictionary=True) as cur:
+                cur.execute(sql, (uid,))
+                row = cur.fetchone()
+
+        if not row or not row['total']:
             return {
                 'total_goals': 0, 'completed_goals': 0,
                 'in_progress_goals': 0, 'average_progress': 0
             }
 
-        done = 0
-        active = 0
-        prog_sum = 0
-        
-        for g in goals:
-            st = g['status']
-            prog_sum += g['current_progress']
-            if st == 'Completed': done += 1
-            if st == 'In Progress': active += 1
-
         return {
-            'total_goals': total,
-            'completed_goals': done,
-            'in_progress_goals': active,
-            'average_progress': round(prog_sum / total, 2)
+            'total_goals': row['total'],
+            'completed_goals': int(row['done'] or 0),
+            'in_progress_goals': int(row['active'] or 0),
+            'average_progress': round(float(row['avg_prog'] or 0), 2)
         }
 
+    @memo_read
     def get_upcoming_deadlines(self, uid, days=7):
-        # Filter in python to avoid dealing with SQL date diffs
-        all_goals = self.get_user_goals(uid)
-        
-        limit = datetime.now().date() + timedelta(days=days)
-        today = datetime.now().date()
-        
-        upcoming = []
-        for g in all_goals:
-            if g['status'] == 'Completed': continue
-            
-            d = g['deadline'] # using aliased name
-            if isinstance(d, datetime): d = d.date()
-            
-            if today <= d <= limit:
-                upcoming.append(g)
-                
-        upcoming.sort(key=lambda x: x['deadline'])
-        return upcoming
\ No newline at end of file
+        # Range scan on idx_dashboard (uid, status, due_date): one range per
+        # open status. progress < 100 keeps the old python status sync rule.
+        sql = """
+            SELECT gid as id,
+                   uid as user_id,
+                   subject,
+                   target_score,
+                   progress as current_progress,
+                   CASE WHEN progress > 0 THEN 'In Progress' ELSE 'Pending' END as status,
+                   due_date as deadline
+            FROM goals
+            WHERE uid = %s
+              AND status IN ('Pending', 'In Progress')
+              AND due_date BETWEEN CURDATE() AND DATE_ADD(CURDATE(), INTERVAL %s DAY)
+              AND progress < 100
+            ORDER BY due_date ASC
+        """
+        with self._db() as conn:
+            with conn.cursor(dictionary=True) as cur:
+                cur.execute(sql, (uid, int(days)))
+                return cur.fetchall()
@@ -0,0 +1,191 @@
+import time
+import bisect
+import threading
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered, Response
+from modules.admin_auth import admin_allowed, admin_denied
+
+# Per-request instrumentation + Prometheus /metrics.
+# Each request collects how many queries it ran and how long it spent in
+# the DB, waiting for a pool connection, rendering templates and drawing
+# charts. When it finishes the numbers go into histograms labelled by
+# endpoint. Everything is per worker process (scrape each worker, or sum
+# them in Prometheus). FinGen's metrics.py is a copy with the same names
+# and config keys.
+
+# seconds
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label='endpoint'):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        self._series = {}   # label value -> [bucket counts..., sum, count]
+
+    def observe(self, label_value, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(label_value)
+            if s is None:
+                s = self._series[label_value] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for lv, s in sorted(series.items()):
+            lbl = f'{self.label}="{_escape(lv)}"'
+            acc = 0
+            for b, n in zip(self.buckets, s):
+                acc += n
+                lines.append(f'{self.name}_bucket{{{lbl},le="{b}"}} {acc}')
+            lines.append(f'{self.name}_bucket{{{lbl},le="+Inf"}} {s[-1]}')
+            lines.append(f'{self.name}_sum{{{lbl}}} {round(s[-2], 6)}')
+            lines.append(f'{self.name}_count{{{lbl}}} {s[-1]}')
+        return lines
+
+
+def _escape(v):
+    return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('app_request_seconds', 'Time spent handling the request', TIME_BUCKETS)
+DB_QUERIES = Histogram('app_db_queries_per_request', 'Queries executed per request', COUNT_BUCKETS)
+DB_SECONDS = Histogram('app_db_seconds', 'Time spent executing queries and fetching rows, per request', TIME_BUCKETS)
+ACQUIRE_SECONDS = Histogram('app_db_acquire_seconds', 'Time spent getting a connection from the pool, per request', TIME_BUCKETS)
+TEMPLATE_SECONDS = Histogram('app_template_seconds', 'Time spent rendering templates, per request', TIME_BUCKETS)
+REQUEST_CHART_SECONDS = Histogram('app_request_chart_seconds', 'Time spent drawing charts, per request', TIME_BUCKETS)
+CHART_SECONDS = Histogram('app_chart_render_seconds', 'Time spent drawing one chart PNG', TIME_BUCKETS, label='chart')
+
+_HISTOGRAMS = [REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, ACQUIRE_SECONDS, TEMPLATE_SECONDS,
+               REQUEST_CHART_SECONDS, CHART_SECONDS]
+_collectors = []
+
+
+def _current():
+    # stats for the request on this thread, None outside one (background
+    # threads: render service, activity sink, export producers)
+    if not has_request_context():
+        return None
+    return g.get('_req_metrics')
+
+
+def add(key, seconds, count=0):
+    st = _current()
+    if st is not None:
+        st[key] += seconds
+        if count:
+            st['queries'] += count
+
+
+# hooks used by db_pool / charts
+
+def record_query(seconds):
+    add('db', seconds, count=1)
+
+def record_fetch(seconds):
+    add('db', seconds)
+
+def record_acquire(seconds):
+    add('acquire', seconds)
+
+def record_chart(chart_type, seconds):
+    CHART_SECONDS.observe(chart_type, seconds)
+    add('chart', seconds)
+
+
+def register_collector(fn):
+    # fn() -> list of (name, type, help, value) for gauges/counters that
+    # live elsewhere (pool, caches, ...), read at scrape time
+    _collectors.append(fn)
+
+
+def _start():
+    g._req_metrics = {'start': time.perf_counter(), 'queries': 0, 'db': 0.0,
+                      'acquire': 0.0, 'template': 0.0, 'chart': 0.0}
+
+def _template_start(sender, template, context, **extra):
+    st = _current()
+    if st is not None:
+        st['_tpl_start'] = time.perf_counter()
+
+def _template_done(sender, template, context, **extra):
+    st = _current()
+    if st is not None and '_tpl_start' in st:
+        st['template'] += time.perf_counter() - st.pop('_tpl_start')
+
+def _finish(st, endpoint):
+    REQUEST_SECONDS.observe(endpoint, time.perf_counter() - st['start'])
+    DB_QUERIES.observe(endpoint, st['queries'])
+    DB_SECONDS.observe(endpoint, st['db'])
+    ACQUIRE_SECONDS.observe(endpoint, st['acquire'])
+    TEMPLATE_SECONDS.observe(endpoint, st['template'])
+    REQUEST_CHART_SECONDS.observe(endpoint, st['chart'])
+
+def _server_timing(st):
+    ms = lambda s: round(s * 1000, 2)
+    return ', '.join([
+        f'db;dur={ms(st["db"])};desc="{st["queries"]} queries"',
+        f'acquire;dur={ms(st["acquire"])}',
+        f'tpl;dur={ms(st["template"])}',
+        f'chart;dur={ms(st["chart"])}',
+        f'app;dur={ms(time.perf_counter() - st["start"])}'
+    ])
+
+def _after(response):
+    st = g.get('_req_metrics')
+    if st is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+
+    # summary for the browser's network tab (Server-Timing) when debugging
+    if response.headers.get('Server-Timing') is None and _show_header():
+        response.headers['Server-Timing'] = _server_timing(st)
+
+    if response.is_streamed:
+        # exports keep querying while the body goes out, count that too
+        response.call_on_close(lambda: _finish(st, endpoint))
+    else:
+        _finish(st, endpoint)
+    return response
+
+def _show_header():
+    return current_app.debug or current_app.config.get('METRICS_HEADER', False)
+
+
+def expose():
+    lines = []
+    for h in _HISTOGRAMS:
+        lines.extend(h.expose())
+    for fn in _collectors:
+        try:
+            samples = fn()
+        except Exception as e:
+            print(f"Metrics collector error: {e}")
+            continue
+        for name, kind, help_text, value in samples:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    app.before_request(_start)
+    app.after_request(_after)
+    before_render_template.connect(_template_start, app)
+    template_rendered.connect(_template_done, app)
+
+    @app.route('/metrics')
+    def metrics():
+        if not admin_allowed():
+            return admin_denied()
+        return Response(expose(), mimetype='text/plain; version=0.0.4')
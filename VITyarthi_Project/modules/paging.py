@@ -0,0 +1,48 @@
+from datetime import datetime
+
+# Keyset ("seek") pagination for the listing pages.
+# Lists are ordered newest first on (timestamp, id) and the next page
+# starts strictly below the last row shown, so every page is one short
+# index range scan no matter how far back the user scrolls - unlike
+# OFFSET, which reads and throws away everything before the page.
+# The cursor handed to the browser is just "<timestamp>_<id>" of that row.
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+def page_size(n):
+    if not n or n < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(int(n), MAX_PAGE_SIZE)
+
+def encode_cursor(ts, row_id):
+    return f"{ts.strftime('%Y%m%d%H%M%S%f')}_{row_id}"
+
+def decode_cursor(cursor):
+    # junk / tampered cursors just mean "first page"
+    if not cursor:
+        return None
+    try:
+        ts, row_id = cursor.split('_')
+        return datetime.strptime(ts, '%Y%m%d%H%M%S%f'), int(row_id)
+    except (ValueError, AttributeError):
+        return None
+
+def seek(where, args, ts_col, id_col, cursor, limit):
+    # adds the "older than the cursor" condition (spelled out instead of a
+    # row comparison so MySQL turns it into a range on the index) and
+    # returns the ORDER BY / LIMIT tail, one row extra for split_page
+    after = decode_cursor(cursor)
+    if after:
+        where.append(f"({ts_col} < %s OR ({ts_col} = %s AND {id_col} < %s))")
+        args.extend([after[0], after[0], after[1]])
+    args.append(limit + 1)
+    return f"ORDER BY {ts_col} DESC, {id_col} DESC LIMIT %s"
+
+def split_page(rows, limit, ts_key, id_key):
+    # the query asks for limit + 1 rows; the extra one only tells us there
+    # is another page
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][ts_key], rows[-1][id_key])
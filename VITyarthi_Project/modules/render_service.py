@@ -0,0 +1,161 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from modules.charts import CHART_TYPES, draw_chart
+
+# states a chart can be in (what /charts/status returns)
+QUEUED = 'queued'
+RENDERING = 'rendering'
+READY = 'ready'
+EMPTY = 'empty'      # no data for this chart yet
+FAILED = 'failed'
+
+
+def _init_worker():
+    # runs once in every render process: matplotlib, style and fonts are
+    # loaded here rather than by the first chart. The process starts fresh
+    # (see _mp_context), so nothing is set up yet
+    import matplotlib
+    matplotlib.use('Agg')
+    from modules.chart_render import apply_style
+    apply_style()
+
+
+def _mp_context():
+    # Not fork: by the time charts are requested the app has threads (activity
+    # sink, slow query log, export producers), locks and DB sockets, and a
+    # forked child could inherit a held lock or share a socket. forkserver
+    # starts children from a clean helper process (spawn where there's none)
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class RenderService:
+    # Moves chart rendering off the request.
+    # request() only queues a job and returns the current status straight
+    # away; a small thread pool does the (cheap) DB fetch + digest check and
+    # hands the actual matplotlib work to a process pool.
+    # Meanwhile the last good PNG on disk keeps being served.
+    def __init__(self, charts, workers=2, timeout=60):
+        self.charts = charts
+        self.workers = workers
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._status = {}     # (uid, chart_type) -> dict
+        self._pid = None
+        self._procs = None
+        self._threads = None
+        atexit.register(self.shutdown)
+
+    def _executors(self):
+        # created lazily and per process, so forking app servers
+        # don't inherit a pool that belongs to the master
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._procs = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                                  initializer=_init_worker)
+                self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='chart-job')
+            return self._threads, self._procs
+
+    def _initial_status(self, uid, chart_type):
+        # whatever is on disk from a previous run counts as "last good"
+        path = self.charts.chart_path(chart_type, uid)
+        version = self.charts.cache.current(path)
+        return {
+            'state': READY if version else QUEUED,
+            'version': version[:12] if version else None,
+            'error': None,
+            'again': False
+        }
+
+    def request(self, uid, chart_type):
+        if chart_type not in CHART_TYPES:
+            raise ValueError(f'Unknown chart: {chart_type}')
+
+        key = (uid, chart_type)
+        with self._lock:
+            st = self._status.get(key)
+            if st is None:
+                st = self._status[key] = self._initial_status(uid, chart_type)
+                busy = False
+            else:
+                busy = st.get('busy', False)
+
+            if busy:
+                # already running, make it go round once more when done
+                st['again'] = True
+                return self._public(st)
+
+            st['busy'] = True
+            if st['version'] is None:
+                st['state'] = QUEUED
+
+        threads, _ = self._executors()
+        threads.submit(self._run, uid, chart_type)
+        return self.status(uid, chart_type)
+
+    def request_many(self, uid, chart_types):
+        return {t: self.request(uid, t) for t in chart_types}
+
+    def status(self, uid, chart_type):
+        with self._lock:
+            st = self._status.get((uid, chart_type))
+            if st is None:
+                st = self._status[(uid, chart_type)] = self._initial_status(uid, chart_type)
+            return self._public(st)
+
+    def _public(self, st):
+        return {
+            'state': st['state'],
+            'version': st['version'],
+            'error': st['error'],
+            'busy': st.get('busy', False)
+        }
+
+    def _render_in_process(self, chart_type, data, path):
+        _, procs = self._executors()
+        return procs.submit(draw_chart, chart_type, data, path).result(timeout=self.timeout)
+
+    def _run(self, uid, chart_type):
+        key = (uid, chart_type)
+        while True:
+            with self._lock:
+                st = self._status[key]
+                st['again'] = False
+                if st['version'] is None:
+                    st['state'] = RENDERING
+
+            try:
+                path = self.charts.render(chart_type, uid, renderer=self._render_in_process)
+                version = self.charts.cache.current(path) if path else None
+                state, err = (READY if path else EMPTY), None
+            except Exception as e:
+                print(f"Chart render error ({chart_type}, {uid}): {e}")
+                path, version, state, err = None, None, FAILED, str(e)
+
+            with self._lock:
+                st = self._status[key]
+                st['state'] = state
+                st['error'] = err
+                if version:
+                    st['version'] = version[:12]
+                elif state == EMPTY:
+                    st['version'] = None
+
+                if not st['again']:
+                    st['busy'] = False
+                    return
+
+    def shutdown(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            threads, procs = self._threads, self._procs
+            self._pid = None
+        threads.shutdown(wait=True)
+        procs.shutdown(wait=True)
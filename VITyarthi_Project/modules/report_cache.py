@@ -0,0 +1,130 @@
+import copy
+import json
+import time
+import threading
+from datetime import date
+from functools import wraps
+from collections import OrderedDict
+from flask import has_request_context
+
+# default seconds a report may be served from memory
+DEFAULT_TTL = {'weekly': 300, 'monthly': 900, 'summary': 600}
+
+
+class ReportCache:
+    # In-process read-through cache for ReportGenerator.
+    # Entries are kept per (user, report, day) together with the user's
+    # data version they were built from (modules/data_version.py). A write
+    # by that user - in this worker or any other - moves the version on,
+    # so the next read is a miss; writes made in this worker also drop the
+    # entries straight away. Bounded by entry count and (roughly) bytes,
+    # least recently used goes first; each report type has its own TTL on
+    # top of that (rollover at midnight is handled by the day in the key).
+    def __init__(self, max_entries=2000, max_bytes=8 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (version, expires, size, value)
+        self._by_user = {}              # uid -> set of keys
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, uid, kind, version):
+        key = (uid, kind, date.today())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != version or entry[1] < time.monotonic():
+                if entry[0] == version:
+                    self.expirations += 1
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            val = entry[3]
+        return copy.deepcopy(val)
+
+    def put(self, uid, kind, version, value):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        key = (uid, kind, date.today())
+        expires = time.monotonic() + self.ttl.get(kind, 300)
+        value = copy.deepcopy(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, expires, size, value)
+            self._by_user.setdefault(uid, set()).add(key)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        # caller holds the lock
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def invalidate(self, uids):
+        with self._lock:
+            for uid in uids:
+                for key in list(self._by_user.get(uid, ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
+
+
+def cached_report(kind):
+    # Read-through on a ReportGenerator method taking just the user id.
+    # Only inside a request: that's where the data version comes from.
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(self, uid):
+            if self.cache is None or self.versions is None or not has_request_context():
+                return fn(self, uid)
+
+            version = self.versions.get(uid)
+            val = self.cache.get(uid, kind, version)
+            if val is None:
+                val = fn(self, uid)
+                self.cache.put(uid, kind, version, val)
+            return val
+        return wrapper
+    return deco
@@ -1,13 +1,38 @@
-import mysql.connector
 from datetime import datetime
+from modules.request_memo import memo_read
+from modules.rollups import rebuild_daily_rollups
+from modules.report_cache import cached_report
 
 class ReportGenerator:
-    def __init__(self, cfg):
-        self.cfg = cfg
+    def __init__(self, pool, cache=None, versions=None):
+        self.pool = pool
+        # optional ReportCache + DataVersions (see report_cache.py)
+        self.cache = cache
+        self.versions = versions
 
+    def _sum_rollups(self, cur, uid, days):
+        # at most `days` rows from daily_rollups (see rollups.py),
+        # today included
+        cur.execute("""
+            SELECT COALESCE(SUM(study_mins), 0) as mins,
+                   COALESCE(SUM(study_sessions), 0) as sessions,
+                   COALESCE(SUM(progress_logs), 0) as logs,
+                   COALESCE(SUM(marks_sum), 0) as marks_sum,
+                   COALESCE(SUM(marks_count), 0) as marks_count,
+                   COALESCE(SUM(goals_updated), 0) as goals_updated,
+                   COALESCE(SUM(badges_earned), 0) as badges
+            FROM daily_rollups
+            WHERE uid = %s AND day > DATE_SUB(CURDATE(), INTERVAL %s DAY)
+        """, (uid, days))
+        r = cur.fetchone()
+        r['avg_marks'] = round(float(r['marks_sum']) / r['marks_count'], 2) if r['marks_count'] else 0
+        return r
+
+    @memo_read
+    @cached_report('weekly')
     def generate_weekly_report(self, uid):
         # Manual connection handling
-        conn = mysql.connector.connect(**self.cfg)
+        conn = self.pool.connect()
         
         # Initialize defaults
         report = {
@@ -20,45 +45,14 @@ class ReportGenerator:
 
         try:
             cur = conn.cursor(dictionary=True)
-            
-            # 1. Goals (from activity logs)
-            # UPDATED: uid, ts
-            cur.execute("""
-                SELECT count(*) as c FROM activity_logs 
-                WHERE uid=%s 
-                AND act_type='goal_updated' 
-                AND ts >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            """, (uid,))
-            row = cur.fetchone()
-            if row: report['goals_updated'] = row['c']
+            r = self._sum_rollups(cur, uid, 7)
 
-            # 2. Sessions
-            # UPDATED: uid, duration_mins, sess_date
-            cur.execute("""
-                SELECT count(*) as c, sum(duration_mins) as m 
-                FROM study_sessions 
-                WHERE uid=%s 
-                AND sess_date >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            """, (uid,))
-            row = cur.fetchone()
-            report['study_sessions'] = row['c']
-            
+            report['goals_updated'] = int(r['goals_updated'])
+            report['study_sessions'] = int(r['sessions'])
             # calc hours in python
-            total_mins = row['m'] if row['m'] else 0
-            report['study_hours'] = round(total_mins / 60, 1)
-
-            # 3. Progress
-            # UPDATED: marks, logged_at, uid, sid
-            sql = """
-                SELECT count(*) as c, avg(marks) as a 
-                FROM progress_logs pl 
-                JOIN subjects s ON pl.sid = s.sid 
-                WHERE s.uid = %s AND pl.logged_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            """
-            cur.execute(sql, (uid,))
-            res = cur.fetchone()
-            report['progress_logs'] = res['c']
-            report['average_marks'] = round(res['a'], 2) if res['a'] else 0
+            report['study_hours'] = round(int(r['mins']) / 60, 1)
+            report['progress_logs'] = int(r['logs'])
+            report['average_marks'] = r['avg_marks']
 
             return report
             
@@ -68,6 +62,8 @@ class ReportGenerator:
         finally:
             conn.close()
 
+    @memo_read
+    @cached_report('monthly')
     def generate_monthly_report(self, user_id):
         # Using Context Manager style
         data = {
@@ -78,40 +74,35 @@ class ReportGenerator:
             'badges_earned': 0
         }
         
-        with mysql.connector.connect(**self.cfg) as conn:
-            with conn.cursor() as cur: # tuple cursor
+        with self.pool.connect() as conn:
+            with conn.cursor(dictionary=True) as cur:
                 
                 # Completed Goals
-                # UPDATED: uid
-                cur.execute("SELECT count(*) FROM goals WHERE uid=%s AND status='Completed' AND created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)", (user_id,))
-                data['goals_completed'] = cur.fetchone()[0]
+                # (goal status isn't a daily event, so this one stays on goals)
+                cur.execute("SELECT count(*) as c FROM goals WHERE uid=%s AND status='Completed' AND created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)", (user_id,))
+                data['goals_completed'] = cur.fetchone()['c']
 
-                # Time
-                # UPDATED: duration_mins, sess_date, uid
-                cur.execute("SELECT sum(duration_mins) FROM study_sessions WHERE uid=%s AND sess_date >= DATE_SUB(NOW(), INTERVAL 30 DAY)", (user_id,))
-                mins = cur.fetchone()[0]
+                # Time, marks, badges from the rollups
+                r = self._sum_rollups(cur, user_id, 30)
+                mins = int(r['mins'])
                 data['study_hours'] = round(mins/60, 1) if mins else 0.0
-
-                # Marks
-                # UPDATED: marks, logged_at, sid, uid
-                cur.execute("""
-                    SELECT avg(marks), count(*) 
-                    FROM progress_logs pl JOIN subjects s ON pl.sid=s.sid 
-                    WHERE s.uid=%s AND pl.logged_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-                """, (user_id,))
-                row = cur.fetchone()
-                data['average_marks'] = round(row[0], 2) if row[0] else 0
-                data['progress_logs'] = row[1]
-
-                # Badges
-                # UPDATED: uid, earned_on
-                cur.execute("SELECT count(*) FROM badges WHERE uid=%s AND earned_on >= DATE_SUB(NOW(), INTERVAL 30 DAY)", (user_id,))
-                data['badges_earned'] = cur.fetchone()[0]
+                data['average_marks'] = r['avg_marks']
+                data['progress_logs'] = int(r['logs'])
+                data['badges_earned'] = int(r['badges'])
 
         return data
 
+    def rebuild_rollups(self, uid=None, days=None):
+        # compaction job, see rollups.rebuild_daily_rollups
+        resp = rebuild_daily_rollups(self.pool, uid=uid, days=days)
+        if self.cache is not None:
+            self.cache.clear()
+        return resp
+
+    @memo_read
+    @cached_report('summary')
     def generate_subject_summary(self, uid):
-        conn = mysql.connector.connect(**self.cfg)
+        conn = self.pool.connect()
         cur = conn.cursor(dictionary=True)
         
         # UPDATED: 
@@ -119,24 +110,36 @@ class ReportGenerator:
         # pl.marks -> marks_scored
         # ss.duration_mins -> study_minutes
         # s.sid, pl.sid, ss.sid
+        # Logs are aggregated per subject on their own and study minutes
+        # come pre-summed from study_totals, then each is joined once.
+        # (Joining both raw tables gave logs x sessions rows per subject
+        # and multiplied SUM(duration_mins).)
         q = """
             SELECT s.name as subject_name,
-                   COUNT(DISTINCT pl.log_id) as total_logs,
-                   AVG(pl.marks) as avg_marks,
-                   MAX(pl.marks) as max_marks,
-                   MIN(pl.marks) as min_marks,
-                   SUM(ss.duration_mins) as study_minutes
+                   pl.total_logs,
+                   pl.avg_marks,
+                   pl.max_marks,
+                   pl.min_marks,
+                   COALESCE(t.total_mins, 0) as study_minutes
             FROM subjects s
-            LEFT JOIN progress_logs pl ON s.sid = pl.sid
-            LEFT JOIN study_sessions ss ON s.sid = ss.sid
+            JOIN (
+                SELECT l.sid,
+                       COUNT(*) as total_logs,
+                       AVG(l.marks) as avg_marks,
+                       MAX(l.marks) as max_marks,
+                       MIN(l.marks) as min_marks
+                FROM progress_logs l
+                JOIN subjects us ON us.sid = l.sid
+                WHERE us.uid = %s
+                GROUP BY l.sid
+            ) pl ON pl.sid = s.sid
+            LEFT JOIN study_totals t ON t.uid = s.uid AND t.sid = s.sid
             WHERE s.uid = %s
-            GROUP BY s.sid
-            HAVING total_logs > 0
             ORDER BY s.name ASC
         """
         
         try:
-            cur.execute(q, (uid,))
+            cur.execute(q, (uid, uid))
             rows = cur.fetchall()
             
             # formatting loop
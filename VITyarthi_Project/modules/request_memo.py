@@ -0,0 +1,72 @@
+import inspect
+from functools import wraps
+from flask import g, has_app_context
+from modules.data_version import mark_dirty
+
+# Per-request memo for manager reads.
+# A single page render tends to ask the same thing several times
+# (get_user_goals, get_streak_info, ...). Reads decorated with
+# @memo_read hit the DB once per request and are answered from flask.g
+# afterwards; any @invalidates write wipes the memo so later reads in
+# the same request see the change, and marks the user's data version
+# for a bump (modules/data_version.py). Outside a request it does nothing.
+
+def _store():
+    memo = g.get('_read_memo')
+    if memo is None:
+        memo = g._read_memo = {}
+    return memo
+
+def _copy(val):
+    # hand out copies so a caller editing rows can't change what the
+    # next caller gets
+    if isinstance(val, list):
+        return [dict(r) if isinstance(r, dict) else r for r in val]
+    if isinstance(val, dict):
+        return dict(val)
+    if isinstance(val, tuple):
+        # (rows, next cursor) from the paged listings
+        return tuple(_copy(v) for v in val)
+    return val
+
+def memo_read(fn):
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if not has_app_context():
+            return fn(self, *args, **kwargs)
+
+        key = (type(self).__name__, fn.__name__, args, tuple(sorted(kwargs.items())))
+        memo = _store()
+        try:
+            if key in memo:
+                return _copy(memo[key])
+        except TypeError:
+            # unhashable argument, just don't cache it
+            return fn(self, *args, **kwargs)
+
+        val = fn(self, *args, **kwargs)
+        memo[key] = val
+        return _copy(val)
+    return wrapper
+
+def _uid_getter(fn):
+    # where the user id sits in this method's arguments ('uid' or 'user_id')
+    names = list(inspect.signature(fn).parameters)[1:]   # minus self
+    name = next((n for n in names if n in ('uid', 'user_id')), None)
+    if name is None:
+        return lambda args, kwargs: None
+    pos = names.index(name)
+    return lambda args, kwargs: kwargs.get(name, args[pos] if pos < len(args) else None)
+
+def invalidates(fn):
+    get_uid = _uid_getter(fn)
+
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return fn(self, *args, **kwargs)
+        finally:
+            if has_app_context():
+                g.pop('_read_memo', None)
+                mark_dirty(get_uid(args, kwargs))
+    return wrapper
@@ -0,0 +1,98 @@
+# Per-user daily rollups (daily_rollups table).
+# The write paths bump today's row in the same transaction as the raw
+# insert, so the reports only ever have to add up <= 30 small rows no
+# matter how many years of history a student has.
+
+ROLLUP_COLS = (
+    'study_mins',
+    'study_sessions',
+    'progress_logs',
+    'marks_sum',
+    'marks_count',
+    'goals_updated',
+    'badges_earned'
+)
+
+def bump_daily(cur, uid, **counts):
+    # adds counts to today's row for uid, creating it if needed
+    unknown = set(counts) - set(ROLLUP_COLS)
+    if unknown:
+        raise ValueError(f'Unknown rollup columns: {unknown}')
+    cols = [c for c in ROLLUP_COLS if counts.get(c)]
+    if not cols:
+        return
+
+    sql = f"""
+        INSERT INTO daily_rollups (uid, day, {', '.join(cols)})
+        VALUES (%s, CURDATE(), {', '.join(['%s'] * len(cols))})
+        ON DUPLICATE KEY UPDATE {', '.join(f'{c} = {c} + VALUES({c})' for c in cols)}
+    """
+    cur.execute(sql, (uid, *[counts[c] for c in cols]))
+
+
+# (target columns, SELECT producing uid, day, values...) per raw table
+_SOURCES = [
+    (('study_mins', 'study_sessions'), """
+        SELECT uid, DATE(sess_date) as d, SUM(duration_mins), COUNT(*)
+        FROM study_sessions
+        WHERE {where}
+        GROUP BY uid, d
+    """, 'sess_date', 'uid'),
+    (('progress_logs', 'marks_sum', 'marks_count'), """
+        SELECT s.uid, DATE(pl.logged_at) as d, COUNT(*), COALESCE(SUM(pl.marks), 0), COUNT(pl.marks)
+        FROM progress_logs pl JOIN subjects s ON pl.sid = s.sid
+        WHERE {where}
+        GROUP BY s.uid, d
+    """, 'pl.logged_at', 's.uid'),
+    (('goals_updated',), """
+        SELECT uid, DATE(ts) as d, COUNT(*)
+        FROM activity_logs
+        WHERE act_type = 'goal_updated' AND {where}
+        GROUP BY uid, d
+    """, 'ts', 'uid'),
+    (('badges_earned',), """
+        SELECT uid, DATE(earned_on) as d, COUNT(*)
+        FROM badges
+        WHERE {where}
+        GROUP BY uid, d
+    """, 'earned_on', 'uid'),
+]
+
+def rebuild_daily_rollups(pool, uid=None, days=None):
+    # Compaction / repair job: recompute rollups from the raw tables,
+    # either for everything or only the last `days` days (and/or one user).
+    conn = pool.connect()
+    cur = conn.cursor()
+    try:
+        where, args = ["1=1"], []
+        if uid:
+            where.append("uid = %s")
+            args.append(uid)
+        if days:
+            where.append("day > DATE_SUB(CURDATE(), INTERVAL %s DAY)")
+            args.append(int(days))
+        cur.execute(f"DELETE FROM daily_rollups WHERE {' AND '.join(where)}", args)
+
+        for cols, select, ts_col, uid_col in _SOURCES:
+            where, args = ["1=1"], []
+            if uid:
+                where.append(f"{uid_col} = %s")
+                args.append(uid)
+            if days:
+                where.append(f"{ts_col} >= DATE_SUB(CURDATE(), INTERVAL %s DAY)")
+                args.append(int(days) - 1)
+
+            cur.execute(f"""
+                INSERT INTO daily_rollups (uid, day, {', '.join(cols)})
+                {select.format(where=' AND '.join(where))}
+                ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in cols)}
+            """, args)
+
+        conn.commit()
+        return {'success': True}
+    except Exception as e:
+        print(f"Rollup rebuild error: {e}")
+        conn.rollback()
+        return {'success': False, 'message': str(e)}
+    finally:
+        conn.close()
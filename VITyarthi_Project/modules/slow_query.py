@@ -0,0 +1,183 @@
+import os
+import re
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from collections import deque
+from logging.handlers import RotatingFileHandler
+import mysql.connector
+
+# Slow query log.
+# TimedCursor (db_pool.py) reports every statement's time here; anything
+# over threshold_ms is written as one JSON line to a rotating log with the
+# normalized SQL, the shape of its parameters, the manager method that ran
+# it and what EXPLAIN said about it right then. The EXPLAIN runs on a
+# background thread with its own connection so the slow request doesn't
+# get slower, and each distinct statement is explained at most once per
+# explain_every seconds. FinGen's slow_query.py is the same thing as
+# module-level functions, with the same names.
+
+_LITERALS = [
+    (re.compile(r"'(?:[^'\\]|\\.)*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%\([a-z_]+\)s|%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+_EXPLAINABLE = ('select', 'update', 'delete', 'insert', 'replace')
+
+# frames that only pass the query along, the caller is whoever is above them
+_PLUMBING = ('modules.db_pool', 'modules.sqlite_backend', 'modules.slow_query', 'modules.metrics',
+             'modules.request_memo', 'modules.report_cache', 'contextlib')
+
+
+def normalize(sql):
+    for pattern, repl in _LITERALS:
+        sql = pattern.sub(repl, sql)
+    return sql.strip()
+
+def params_shape(params, many=False):
+    if many:
+        params = list(params or [])
+        return f"{len(params)} x {params_shape(params[0]) if params else '()'}"
+    if params is None:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in sorted(params.items())) + '}'
+    return '(' + ', '.join(type(p).__name__ for p in params) + ')'
+
+def find_caller():
+    f = sys._getframe(1)
+    while f is not None:
+        mod = f.f_globals.get('__name__', '')
+        if mod not in _PLUMBING and not mod.startswith('mysql'):
+            owner = f.f_locals.get('self')
+            if owner is not None:
+                return f'{type(owner).__name__}.{f.f_code.co_name}'
+            return f'{mod}.{f.f_code.co_name}'
+        f = f.f_back
+    return 'unknown'
+
+
+class SlowQueryLog:
+    def __init__(self, db_conf, path, threshold_ms=200, explain=True, explain_every=60,
+                 max_bytes=5 * 1024 * 1024, backups=5, explain_with=None):
+        self.db_conf = db_conf
+        # callable(sql, params) -> plan rows, instead of EXPLAIN on a MySQL
+        # connection of our own (SQLitePool.explain)
+        self.explain_with = explain_with
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_every = explain_every
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.log = logging.getLogger(f'slow_queries.{path}')
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        if not self.log.handlers:
+            h = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+            h.setFormatter(logging.Formatter('%(message)s'))
+            self.log.addHandler(h)
+
+        self._jobs = queue.Queue(maxsize=500)
+        self._explained = {}   # normalized sql -> last time we ran EXPLAIN
+        self._lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+
+    def check(self, sql, params, seconds, many=False):
+        if seconds < self.threshold:
+            return False
+        if isinstance(sql, bytes):
+            sql = sql.decode('utf-8', 'replace')
+
+        entry = {
+            'ts': datetime.now().isoformat(timespec='seconds'),
+            'ms': round(seconds * 1000, 1),
+            'caller': find_caller(),
+            'sql': normalize(sql),
+            'params': params_shape(params, many)
+        }
+
+        if self.explain and not many and sql.lstrip().lower().startswith(_EXPLAINABLE) and self._due(entry['sql']):
+            try:
+                self._ensure_thread()
+                self._jobs.put_nowait((entry, sql, params))
+                return True
+            except queue.Full:
+                entry['explain'] = 'skipped (explain queue full)'
+        self._write(entry)
+        return True
+
+    def _due(self, key):
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(key)
+            if last is not None and now - last < self.explain_every:
+                return False
+            self._explained[key] = now
+            if len(self._explained) > 1000:
+                self._explained.clear()
+            return True
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._conn = None
+                threading.Thread(target=self._loop, name='slow-query-explain', daemon=True).start()
+
+    def _loop(self):
+        while True:
+            entry, sql, params = self._jobs.get()
+            try:
+                entry['explain'] = self._run_explain(sql, params)
+            except Exception as e:
+                entry['explain'] = f'failed: {e}'
+                self._conn = None
+            self._write(entry)
+
+    def _run_explain(self, sql, params):
+        if self.explain_with is not None:
+            return self.explain_with(sql, params)
+        # own connection, never a pooled one: the pool may be what's slow
+        if self._conn is None or not self._conn.is_connected():
+            self._conn = mysql.connector.connect(**self.db_conf)
+        cur = self._conn.cursor(dictionary=True)
+        try:
+            cur.execute('EXPLAIN ' + sql, params or ())
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            self._conn.rollback()
+        keep = ('id', 'select_type', 'table', 'type', 'possible_keys', 'key', 'rows', 'filtered', 'Extra')
+        return [{k: r.get(k) for k in keep} for r in rows]
+
+    def _write(self, entry):
+        self.log.info(json.dumps(entry, default=str))
+
+    def recent(self, limit=100):
+        # newest first, straight from the log file so every worker's
+        # entries show up
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                lines = deque(f, maxlen=limit)
+        except OSError:
+            return []
+        out = []
+        for line in reversed(lines):
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue
+            plan = e.get('explain')
+            e['full_scan'] = isinstance(plan, list) and any(r.get('type') == 'ALL' for r in plan)
+            out.append(e)
+        return out
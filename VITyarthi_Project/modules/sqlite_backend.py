@@ -0,0 +1,347 @@
+import os
+import re
+import time
+import sqlite3
+import weakref
+import threading
+from decimal import Decimal
+from datetime import datetime, date
+from functools import lru_cache
+from mysql.connector import errors as mysql_errors
+from modules.db_pool import TimedCursor
+from modules.metrics import record_acquire
+
+# SQLite backend.
+# SQLitePool is a drop-in for ConnectionPool (db_pool.py): the managers keep
+# writing MySQL flavoured SQL with %s placeholders and the cursor rewrites
+# it for SQLite (NOW(), CURDATE(), DATE_SUB/DATE_ADD, DATE_FORMAT, INSERT
+# IGNORE, ON DUPLICATE KEY UPDATE). Rows come back the way mysql.connector
+# hands them out (tuples or dicts, datetime/date values) and errors are
+# raised as mysql.connector errors with the matching errno, so nothing in
+# the managers has to know which backend it's talking to.
+#
+# The database is one local file in WAL mode. Connections are per thread:
+# each thread keeps its own idle ones and reuses them, nothing is ever
+# shared across threads.
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'schema_sqlite.sql')
+
+_INTERVAL_UNITS = {'SECOND': 'seconds', 'MINUTE': 'minutes', 'HOUR': 'hours',
+                   'DAY': 'days', 'MONTH': 'months', 'YEAR': 'years'}
+_NOW = "datetime('now', 'localtime')"
+_TODAY = "date('now', 'localtime')"
+
+_DATE_MATH = re.compile(r"DATE_(SUB|ADD)\(\s*(NOW\(\)|CURDATE\(\))\s*,\s*INTERVAL\s+(%s|\d+)\s+(\w+)\s*\)", re.I)
+_DATE_FORMAT = re.compile(r"DATE_FORMAT\(\s*([\w.]+)\s*,\s*('[^']*')\s*\)", re.I)
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.I)
+
+# values that look like DATETIME / DATE columns, e.g. DATE(logged_at) or
+# NOW() results, which SQLite returns as plain text
+_TS_TEXT = re.compile(r"\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)?$")
+
+
+def _date_math(m):
+    op, base, n, unit = m.groups()
+    unit = _INTERVAL_UNITS[unit.upper()]
+    fn = 'datetime' if base.upper().startswith('NOW') else 'date'
+    sign = '-' if op.upper() == 'SUB' else '+'
+    if n == '%s':
+        mod = f"'{sign}' || %s || ' {unit}'"
+    else:
+        mod = f"'{sign}{n} {unit}'"
+    return f"{fn}('now', 'localtime', {mod})"
+
+
+@lru_cache(maxsize=512)
+def translate(sql):
+    # MySQL dialect -> SQLite, only the bits this app uses
+    head, dup, tail = sql, None, ''
+    m = _ON_DUPLICATE.search(sql)
+    if m:
+        head, tail = sql[:m.start()], sql[m.end():]
+        dup = _VALUES_REF.sub(r'excluded.\1', tail)
+
+    head = re.sub(r'\bINSERT\s+IGNORE\b', 'INSERT OR IGNORE', head, flags=re.I)
+    if dup is not None:
+        # no conflict target: SQLite (3.35+) then applies it to any unique key
+        head = f"{head}ON CONFLICT DO UPDATE SET{dup}"
+
+    out = _DATE_MATH.sub(_date_math, head)
+    out = _DATE_FORMAT.sub(r'strftime(\2, \1)', out)
+    out = re.sub(r'\bNOW\(\)', _NOW, out, flags=re.I)
+    out = re.sub(r'\bCURDATE\(\)', _TODAY, out, flags=re.I)
+    return out.replace('%s', '?').replace('%%', '%')
+
+
+def _from_text(v):
+    if isinstance(v, str) and len(v) >= 10 and _TS_TEXT.match(v):
+        if len(v) == 10:
+            return date.fromisoformat(v)
+        return datetime.fromisoformat(v)
+    return v
+
+
+# stored the way MySQL would print them, so text comparisons between
+# columns, parameters and date('now') line up
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(' '))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(Decimal, float)
+
+
+def _mysql_error(e):
+    # same classes / errno as mysql.connector, the managers check those
+    msg = str(e)
+    if isinstance(e, sqlite3.IntegrityError):
+        if msg.startswith('UNIQUE') or 'PRIMARY KEY' in msg:
+            errno = 1062   # ER_DUP_ENTRY
+        elif msg.startswith('FOREIGN KEY'):
+            errno = 1452   # ER_NO_REFERENCED_ROW_2
+        elif msg.startswith('NOT NULL'):
+            errno = 1048   # ER_BAD_NULL_ERROR
+        else:
+            errno = 3819   # ER_CHECK_CONSTRAINT_VIOLATED
+        return mysql_errors.IntegrityError(msg=msg, errno=errno)
+    if isinstance(e, sqlite3.DataError):
+        return mysql_errors.DataError(msg=msg)
+    if isinstance(e, sqlite3.OperationalError):
+        if 'locked' in msg or 'busy' in msg:
+            return mysql_errors.DatabaseError(msg=msg, errno=1205)   # ER_LOCK_WAIT_TIMEOUT
+        return mysql_errors.ProgrammingError(msg=msg)
+    if isinstance(e, sqlite3.ProgrammingError):
+        return mysql_errors.ProgrammingError(msg=msg)
+    return mysql_errors.DatabaseError(msg=msg)
+
+
+class SQLiteCursor:
+    # mysql.connector-shaped cursor on top of a sqlite3 one
+    def __init__(self, raw, dictionary=False):
+        self._cur = raw.cursor()
+        self.dictionary = dictionary
+
+    def _call(self, fn, *args):
+        try:
+            return fn(*args)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def execute(self, sql, params=()):
+        self._call(self._cur.execute, translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_params):
+        self._call(self._cur.executemany, translate(sql), [tuple(p) for p in seq_params])
+
+    def _row(self, row):
+        row = tuple(_from_text(v) for v in row)
+        if self.dictionary:
+            return dict(zip(self.column_names, row))
+        return row
+
+    @property
+    def column_names(self):
+        return tuple(d[0] for d in self._cur.description or ())
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    def fetchone(self):
+        row = self._call(self._cur.fetchone)
+        return None if row is None else self._row(row)
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._call(self._cur.fetchmany, size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._call(self._cur.fetchall)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    # what SQLitePool.connect() hands out; close() / leaving a `with`
+    # block puts the sqlite3 connection back on this thread's idle list
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._thread = threading.get_ident()
+
+    def cursor(self, dictionary=False, **kwargs):
+        return TimedCursor(SQLiteCursor(self._raw, dictionary=dictionary), self._pool.slow_log)
+
+    def commit(self):
+        try:
+            self._raw.commit()
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def rollback(self):
+        self._raw.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def is_connected(self):
+        return self._raw is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            # a forgotten one collected on another thread can't be reused
+            # (or closed) from here, sqlite3 closes it when it's freed
+            if threading.get_ident() == self._thread:
+                self._pool._release(raw)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class _ThreadConns(list):
+    # one thread's idle connections; `opened` counts every connection that
+    # thread has open (idle or handed out), settled when the thread is gone
+    def __init__(self):
+        super().__init__()
+        self.opened = [0]
+
+
+class SQLitePool:
+    def __init__(self, path, timeout=10, schema=SCHEMA_PATH):
+        self.path = path
+        self.timeout = timeout
+        self.slow_log = None   # optional SlowQueryLog, see slow_query.py
+        self.conf = {'database': path}
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'checkouts': 0, 'created': 0, 'closed': 0, 'timeouts': 0}
+
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        if schema:
+            self.init_schema(schema)
+
+    def _new_raw(self):
+        raw = sqlite3.connect(self.path, timeout=self.timeout)
+        raw.execute('PRAGMA journal_mode = WAL')
+        raw.execute('PRAGMA synchronous = NORMAL')
+        raw.execute('PRAGMA foreign_keys = ON')
+        self._idle().opened[0] += 1
+        with self._lock:
+            self._stats['created'] += 1
+        return raw
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        self._idle().opened[0] -= 1
+        self._closed(1)
+
+    def _closed(self, n):
+        with self._lock:
+            self._stats['closed'] += n
+
+    def _idle(self):
+        idle = getattr(self._local, 'idle', None)
+        if idle is None:
+            idle = self._local.idle = _ThreadConns()
+            # sqlite3 closes a dead thread's connections when they're collected
+            weakref.finalize(idle, lambda opened: self._closed(opened[0]), idle.opened)
+        return idle
+
+    def connect(self):
+        start = time.perf_counter()
+        idle = self._idle()
+        raw = idle.pop() if idle else self._new_raw()
+        record_acquire(time.perf_counter() - start)
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return SQLiteConnection(self, raw)
+
+    def _release(self, raw):
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        self._idle().append(raw)
+
+    def init_schema(self, path=SCHEMA_PATH):
+        # creates whatever tables are missing (the script is all IF NOT EXISTS)
+        with open(path, encoding='utf-8') as f:
+            script = f.read()
+        raw = self._new_raw()
+        try:
+            raw.executescript(script)
+        finally:
+            self._discard(raw)
+
+    def explain(self, sql, params=()):
+        # EXPLAIN QUERY PLAN in the shape SlowQueryLog stores MySQL plans:
+        # a plain SCAN of a table is reported as type ALL (full scan)
+        raw = self._idle().pop() if self._idle() else self._new_raw()
+        try:
+            rows = raw.execute('EXPLAIN QUERY PLAN ' + translate(sql), tuple(params or ())).fetchall()
+        finally:
+            self._release(raw)
+        plan = []
+        for row in rows:
+            detail = row[-1]
+            m = re.match(r'(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (\w+))?)?', detail)
+            if m is None:
+                plan.append({'id': row[0], 'table': None, 'type': None, 'key': None, 'Extra': detail})
+                continue
+            kind, table, key = m.groups()
+            if kind == 'SEARCH':
+                typ = 'ref'
+            elif 'INDEX' in detail:
+                typ = 'index'
+            else:
+                typ = 'ALL'
+            plan.append({'id': row[0], 'table': table, 'type': typ, 'key': key, 'Extra': detail})
+        return plan
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        s['open'] = s['created'] - s['closed']
+        s['idle'] = len(self._idle())   # this thread's
+        s['waits'] = 0                  # nothing to wait for, busy time shows up in the queries
+        return s
+
+    def close_all(self):
+        # only this thread's idle connections; other threads' go with them
+        idle = self._idle()
+        while idle:
+            self._discard(idle.pop())
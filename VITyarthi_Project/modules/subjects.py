@@ -1,12 +1,23 @@
-import mysql.connector
 from datetime import datetime
+from modules.request_memo import memo_read, invalidates
+from modules.rollups import bump_daily
+from modules.paging import page_size, seek, split_page
+
+# adds one session to the per-subject row and the sid = 0 (all subjects) row
+STUDY_TOTALS_BUMP = """
+    INSERT INTO study_totals (uid, sid, total_mins, sessions)
+    VALUES (%s, %s, %s, 1), (%s, 0, %s, 1)
+    ON DUPLICATE KEY UPDATE total_mins = total_mins + VALUES(total_mins),
+                            sessions = sessions + 1
+"""
 
 class SubjectManager:
-    def __init__(self, conf):
-        self.conf = conf
+    def __init__(self, pool):
+        self.pool = pool
 
+    @invalidates
     def create_subject(self, uid, name):
-        conn = mysql.connector.connect(**self.conf)
+        conn = self.pool.connect()
         cur = conn.cursor()
         
         # UPDATED: 'name' and 'uid'
@@ -25,9 +36,10 @@ class SubjectManager:
         finally:
             conn.close()
 
+    @memo_read
     def get_user_subjects(self, uid):
         # UPDATED: Mapping DB columns (sid, name) -> Template variables (id, subject_name)
-        with mysql.connector.connect(**self.conf) as conn:
+        with self.pool.connect() as conn:
             with conn.cursor(dictionary=True) as cur:
                 sql = """
                     SELECT sid as id, uid as user_id, name as subject_name, added_on as created_at 
@@ -38,33 +50,49 @@ class SubjectManager:
                 cur.execute(sql, (uid,))
                 return cur.fetchall()
 
+    @memo_read
     def get_user_subjects_with_progress(self, uid):
         # This query joins subjects, logs, and goals
-        conn = mysql.connector.connect(**self.conf)
+        conn = self.pool.connect()
         cur = conn.cursor(dictionary=True)
         
         # UPDATED: heavy aliasing to match template expectations
         # subjects: sid -> id, name -> subject_name
         # progress_logs: marks -> marks_scored
         # goals: progress -> current_progress
+        # Logs are summed per subject first and goals are cut down to one
+        # (the newest) per subject name before joining, so several goals
+        # on one subject no longer multiply the log totals.
         sql = """
             SELECT s.sid as id, 
                    s.name as subject_name,
-                   COUNT(DISTINCT pl.log_id) as total_logs,
-                   SUM(pl.marks) as total_marks,
-                   AVG(pl.marks) as avg_marks,
+                   COALESCE(pl.total_logs, 0) as total_logs,
+                   pl.total_marks,
+                   pl.avg_marks,
                    g.target_score,
                    g.progress as current_progress
             FROM subjects s
-            LEFT JOIN progress_logs pl ON s.sid = pl.sid
-            LEFT JOIN goals g ON g.subject = s.name AND g.uid = s.uid
+            LEFT JOIN (
+                SELECT l.sid,
+                       COUNT(*) as total_logs,
+                       SUM(l.marks) as total_marks,
+                       AVG(l.marks) as avg_marks
+                FROM progress_logs l
+                JOIN subjects us ON us.sid = l.sid
+                WHERE us.uid = %s
+                GROUP BY l.sid
+            ) pl ON pl.sid = s.sid
+            LEFT JOIN (
+                SELECT subject, target_score, progress
+                FROM goals
+                WHERE gid IN (SELECT MAX(gid) FROM goals WHERE uid = %s GROUP BY subject)
+            ) g ON g.subject = s.name
             WHERE s.uid = %s
-            GROUP BY s.sid
             ORDER BY s.name ASC
         """
         
         try:
-            cur.execute(sql, (uid,))
+            cur.execute(sql, (uid, uid, uid))
             rows = cur.fetchall()
             return rows
         except Exception as e:
@@ -73,8 +101,9 @@ class SubjectManager:
         finally:
             conn.close()
 
+    @invalidates
     def log_subject_progress(self, sid, uid, marks, notes=''):
-        conn = mysql.connector.connect(**self.conf)
+        conn = self.pool.connect()
         cur = conn.cursor()
         
         # 1. check ownership
@@ -99,6 +128,10 @@ class SubjectManager:
                 "INSERT INTO progress_logs (gid, sid, marks, logged_at, notes) VALUES (%s, %s, %s, NOW(), %s)",
                 (gid, sid, marks, notes)
             )
+            has_marks = marks not in (None, '')
+            bump_daily(cur, uid, progress_logs=1,
+                       marks_sum=float(marks) if has_marks else 0,
+                       marks_count=1 if has_marks else 0)
             conn.commit()
             return {'success': True}
         except Exception as e:
@@ -106,23 +139,29 @@ class SubjectManager:
         finally:
             conn.close()
 
-    def get_subject_progress_history(self, sid, uid):
-        with mysql.connector.connect(**self.conf) as conn:
+    @memo_read
+    def get_subject_progress_history(self, sid, uid, after=None, limit=None):
+        # one page, newest first: (rows, next cursor); idx_recent (sid, logged_at) + pk
+        limit = page_size(limit)
+        where, args = ["pl.sid = %s", "s.uid = %s"], [sid, uid]
+        tail = seek(where, args, 'pl.logged_at', 'pl.log_id', after, limit)
+        with self.pool.connect() as conn:
             with conn.cursor(dictionary=True) as cur:
                 # Aliasing for consistency
-                q = """
+                q = f"""
                     SELECT pl.log_id as id, pl.marks as marks_scored, pl.logged_at as date_logged, pl.notes, 
                            s.name as subject_name 
                     FROM progress_logs pl
                     JOIN subjects s ON pl.sid = s.sid
-                    WHERE pl.sid = %s AND s.uid = %s
-                    ORDER BY pl.logged_at DESC
+                    WHERE {' AND '.join(where)}
+                    {tail}
                 """
-                cur.execute(q, (sid, uid))
-                return cur.fetchall()
+                cur.execute(q, args)
+                return split_page(cur.fetchall(), limit, 'date_logged', 'id')
 
+    @invalidates
     def log_study_session(self, uid, sid, mins):
-        conn = mysql.connector.connect(**self.conf)
+        conn = self.pool.connect()
         cur = conn.cursor()
         
         try:
@@ -131,32 +170,39 @@ class SubjectManager:
                 "INSERT INTO study_sessions (uid, sid, duration_mins, sess_date) VALUES (%s, %s, %s, NOW())",
                 (uid, sid, mins)
             )
+
+            # bump the running totals in the same transaction
+            # (sid = 0 row is the user's grand total)
+            cur.execute(STUDY_TOTALS_BUMP, (uid, sid, mins, uid, mins))
+            bump_daily(cur, uid, study_mins=int(mins), study_sessions=1)
             conn.commit()
             
-            # Check for badge (Study Pro)
-            cur.execute("SELECT SUM(duration_mins) FROM study_sessions WHERE uid=%s", (uid,))
+            # Check for badge (Study Pro) - one PK lookup instead of a full SUM
+            cur.execute("SELECT total_mins FROM study_totals WHERE uid=%s AND sid=0", (uid,))
             res = cur.fetchone()
             total = res[0] if res and res[0] else 0
             
             if total >= 3000: # 50 hours
                 from modules.auth import AuthManager
-                am = AuthManager(self.conf)
+                am = AuthManager(self.pool)
                 am.award_badge(uid, 'Study Pro', 'achievement')
 
             return {'success': True}
         except Exception as e:
             print(f"Study Log Error: {e}")
+            conn.rollback()
             return {'success': False, 'message': str(e)}
         finally:
             conn.close()
 
+    @memo_read
     def get_study_time_stats(self, uid):
         stats = {'total_hours': 0, 'weekly_hours': 0}
         
-        with mysql.connector.connect(**self.conf) as conn:
+        with self.pool.connect() as conn:
             with conn.cursor() as cur:
-                # Total
-                cur.execute("SELECT sum(duration_mins) FROM study_sessions WHERE uid=%s", (uid,))
+                # Total (kept up to date by log_study_session)
+                cur.execute("SELECT total_mins FROM study_totals WHERE uid=%s AND sid=0", (uid,))
                 row = cur.fetchone()
                 if row and row[0]:
                     stats['total_hours'] = round(row[0] / 60, 1)
@@ -170,4 +216,35 @@ class SubjectManager:
                 if row and row[0]:
                     stats['weekly_hours'] = round(row[0] / 60, 1)
                     
-        return stats
\ No newline at end of file
+        return stats
+
+    @invalidates
+    def rebuild_study_totals(self, uid=None):
+        # Recompute study_totals from the raw study_sessions history.
+        # Safe to run any time (e.g. after importing old data), one
+        # transaction so readers never see half rebuilt numbers.
+        where, args = ("WHERE uid = %s", (uid,)) if uid else ("", ())
+        conn = self.pool.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(f"DELETE FROM study_totals {where}", args)
+            cur.execute(f"""
+                INSERT INTO study_totals (uid, sid, total_mins, sessions)
+                SELECT uid, sid, SUM(duration_mins), COUNT(*)
+                FROM study_sessions {where}
+                GROUP BY uid, sid
+            """, args)
+            cur.execute(f"""
+                INSERT INTO study_totals (uid, sid, total_mins, sessions)
+                SELECT uid, 0, SUM(duration_mins), COUNT(*)
+                FROM study_sessions {where}
+                GROUP BY uid
+            """, args)
+            conn.commit()
+            return {'success': True}
+        except Exception as e:
+            print(f"Rebuild totals error: {e}")
+            conn.rollback()
+            return {'success': False, 'message': str(e)}
+        finally:
+            conn.close()
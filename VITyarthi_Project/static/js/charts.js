@@ -0,0 +1,86 @@
+// Client side versions of the ChartGenerator charts.
+// Data comes from /api/charts (same queries as modules/charts.py),
+// so the server only ships a bit of JSON instead of a rendered PNG.
+(function () {
+    var TEAL = '#4ecdc4', RED = '#ff6b6b', MINT = '#95e1d3';
+
+    var builders = {
+        goal_completion: function (d) {
+            return {
+                type: 'pie',
+                data: {labels: d.labels, datasets: [{data: d.sizes, backgroundColor: [RED, TEAL, MINT]}]},
+                options: {plugins: {title: {display: true, text: 'Goal Status', font: {weight: 'bold'}}}}
+            };
+        },
+        weekly_progress: function (d) {
+            return {
+                type: 'line',
+                data: {labels: d.dates, datasets: [{
+                    label: 'Total Marks', data: d.vals, borderColor: TEAL,
+                    backgroundColor: 'rgba(78, 205, 196, 0.3)', fill: true, borderWidth: 2
+                }]},
+                options: {
+                    plugins: {title: {display: true, text: 'Weekly Trends'}, legend: {display: false}},
+                    scales: {y: {beginAtZero: true, title: {display: true, text: 'Total Marks'}}}
+                }
+            };
+        },
+        subject_performance: function (d) {
+            return {
+                type: 'bar',
+                data: {labels: d.names, datasets: [{label: 'Avg Marks', data: d.avgs, backgroundColor: MINT}]},
+                options: {
+                    indexAxis: 'y',
+                    plugins: {title: {display: true, text: 'Subject Performance'}, legend: {display: false}},
+                    scales: {x: {beginAtZero: true}}
+                }
+            };
+        },
+        monthly_comparison: function (d) {
+            return {
+                data: {labels: d.months, datasets: [
+                    {type: 'bar', label: 'Logs', data: d.counts, backgroundColor: 'rgba(78, 205, 196, 0.6)', yAxisID: 'y'},
+                    {type: 'line', label: 'Avg', data: d.scores, borderColor: RED, backgroundColor: RED, yAxisID: 'y1'}
+                ]},
+                options: {
+                    plugins: {title: {display: true, text: 'Monthly Overview'}},
+                    scales: {
+                        y: {beginAtZero: true, position: 'left', title: {display: true, text: 'Count', color: TEAL}},
+                        y1: {position: 'right', grid: {drawOnChartArea: false}, title: {display: true, text: 'Avg Score', color: RED}}
+                    }
+                }
+            };
+        },
+        study_time: function (d) {
+            return {
+                type: 'pie',
+                data: {labels: d.labels, datasets: [{data: d.hours}]},
+                options: {plugins: {title: {display: true, text: 'Study Hours'}}}
+            };
+        }
+    };
+
+    function empty(canvas) {
+        var p = document.createElement('p');
+        p.textContent = 'No data yet';
+        p.style.cssText = 'text-align: center; color: #95a5a6; padding: 40px 0;';
+        canvas.replaceWith(p);
+    }
+
+    // draws every <canvas data-chart="..."> on the page with one request
+    window.drawCharts = function (apiUrl) {
+        var canvases = document.querySelectorAll('canvas[data-chart]');
+        if (!canvases.length) return;
+        var types = Array.prototype.map.call(canvases, function (c) { return c.dataset.chart; });
+
+        fetch(apiUrl + '?types=' + types.join(','), {credentials: 'same-origin'})
+            .then(function (r) { return r.json(); })
+            .then(function (all) {
+                canvases.forEach(function (c) {
+                    var d = all[c.dataset.chart];
+                    if (!d || !builders[c.dataset.chart]) return empty(c);
+                    new Chart(c.getContext('2d'), builders[c.dataset.chart](d));
+                });
+            });
+    };
+})();
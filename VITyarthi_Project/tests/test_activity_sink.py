@@ -0,0 +1,167 @@
+"""ActivitySink + AuthManager.get_recent_activities against the SQLite backend.
+
+Covers the write-behind buffer's read-your-writes merge on the first page
+of the activity timeline, the keyset cursors across buffered and stored
+rows, and re-queueing when a flush fails. No MySQL server needed.
+
+Run from VITyarthi_Project/:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql.connector.errors import InterfaceError
+from modules.sqlite_backend import SQLitePool
+from modules.activity_sink import ActivitySink
+from modules.auth import AuthManager
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class _DownPool:
+    # stands in for a pool whose server has gone away
+    def connect(self):
+        raise InterfaceError(msg='server gone')
+
+
+class ActivitySinkTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.pool = SQLitePool(os.path.join(self.dir, 'tracker.db'))
+        # nothing gets flushed unless a test asks for it
+        self.sink = ActivitySink(self.pool, batch_size=10000, flush_interval=3600)
+        self.auth = AuthManager(self.pool, activity_sink=self.sink)
+        with self.pool.connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO users (username, email, pwd_hash) VALUES ('ana', 'ana@example.com', 'x')")
+                self.uid = cur.lastrowid
+            conn.commit()
+
+    def tearDown(self):
+        self.sink.close()
+        self.pool.close_all()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def add(self, n, start=T0, prefix='ev'):
+        # n events one second apart, oldest first
+        for i in range(n):
+            self.sink.add(self.uid, 'test', f'{prefix}{i}', start + timedelta(seconds=i))
+
+    def page(self, limit=10, after=None):
+        return self.auth.get_recent_activities(self.uid, limit=limit, after=after)
+
+    def walk(self, limit):
+        out, after = [], None
+        while True:
+            rows, after = self.page(limit, after)
+            out.extend(rows)
+            if after is None:
+                return out
+
+    def stored(self):
+        with self.pool.connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) FROM activity_logs WHERE uid = %s", (self.uid,))
+                return cur.fetchone()[0]
+
+    def test_event_visible_before_and_after_flush(self):
+        self.sink.add(self.uid, 'goal', 'Created goal')
+
+        rows, _ = self.page()
+        self.assertEqual([r['description'] for r in rows], ['Created goal'])
+        self.assertIsNone(rows[0]['id'])   # still buffered
+        self.assertEqual(self.stored(), 0)
+
+        self.sink.flush()
+        rows, _ = self.page()
+        self.assertEqual([r['description'] for r in rows], ['Created goal'])
+        self.assertIsNotNone(rows[0]['id'])
+        self.assertEqual(self.stored(), 1)
+
+    def test_no_duplicates_when_flushed_between_snapshot_and_query(self):
+        self.add(3)
+        pending = self.sink.pending
+
+        def pending_then_flush(uid):
+            # the flusher commits right after the buffer was read
+            evs = pending(uid)
+            self.sink.flush()
+            return evs
+
+        self.sink.pending = pending_then_flush
+        rows, _ = self.page()
+        self.assertEqual([r['description'] for r in rows], ['ev2', 'ev1', 'ev0'])
+        self.assertTrue(all(r['id'] is not None for r in rows))
+
+    def test_cursor_after_buffered_events_fill_the_page(self):
+        self.add(5, prefix='old')
+        self.sink.flush()
+        self.add(4, start=T0 + timedelta(hours=1), prefix='new')
+
+        rows, after = self.page(limit=4)
+        self.assertEqual([r['description'] for r in rows], ['new3', 'new2', 'new1', 'new0'])
+        self.assertIsNotNone(after)
+
+        # page 2 starts at the newest stored row, nothing skipped or repeated
+        rows, _ = self.page(limit=4, after=after)
+        self.assertEqual([r['description'] for r in rows], ['old4', 'old3', 'old2', 'old1'])
+
+    def test_cursor_after_page_mixing_buffered_and_stored(self):
+        self.add(6, prefix='old')
+        self.sink.flush()
+        self.add(2, start=T0 + timedelta(hours=1), prefix='new')
+
+        seen = [r['description'] for r in self.walk(limit=4)]
+        self.assertEqual(seen, ['new1', 'new0'] + [f'old{i}' for i in range(5, -1, -1)])
+
+    def test_keyset_pages_with_equal_timestamps(self):
+        # same second for everything: only the id tells rows apart
+        for i in range(7):
+            self.sink.add(self.uid, 'test', f'ev{i}', T0)
+        self.sink.flush()
+
+        rows = self.walk(limit=3)
+        self.assertEqual(len(rows), 7)
+        ids = [r['id'] for r in rows]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_failed_flush_requeues_batch(self):
+        self.add(3)
+        self.sink.pool = _DownPool()
+        self.sink.flush_interval = 0   # the flusher's retry pause
+        with self.sink._cond:
+            batch = self.sink._buf[:]
+            del self.sink._buf[:]
+            self.sink._inflight.append(batch)
+
+        self.assertFalse(self.sink._flush_batch(batch))
+        self.assertEqual(self.sink.stats['errors'], 1)
+        self.assertEqual([e[2] for e in self.sink._buf], ['ev0', 'ev1', 'ev2'])
+        self.assertEqual(self.sink._inflight, [])
+        # still shown while waiting for the next round
+        self.assertEqual([e[2] for e in self.sink.pending(self.uid)], ['ev2', 'ev1', 'ev0'])
+
+        self.sink.pool = self.pool
+        self.sink.flush()
+        self.assertEqual(self.stored(), 3)
+        self.assertEqual(self.sink.pending(self.uid), [])
+
+    def test_sync_write_failure_does_not_raise(self):
+        sink = ActivitySink(_DownPool(), max_pending=0, put_timeout=0.01)
+        try:
+            sink.add(self.uid, 'test', 'ev')
+            self.assertEqual(sink.stats['sync_writes'], 1)
+            self.assertEqual(sink.stats['errors'], 1)
+        finally:
+            sink.close()
+
+
+if __name__ == '__main__':
+    unittest.main()